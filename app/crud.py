@@ -1,13 +1,24 @@
 # app/crud.py
 
+from sqlalchemy import Integer, String, cast, exists, func, select, text, tuple_, literal_column
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.orm import Session
 from . import models
+from .services.cpe_matching import cpe_match_row, cpe_name_part
+from .services.domain_utils import registrable_domain, reversed_domain_key
+from .services.watchlist_matcher import DEFAULT_MIN_CVSS_SCORE, report_vendor
 from datetime import datetime
 
+BREACH_UPSERT_BATCH_SIZE = 500
+CVE_BACKFILL_BATCH_SIZE = 5000
+
 # ——— SOC2Report CRUD ———
 def create_report(db: Session, filename: str, result: dict) -> models.SOC2Report:
-    report = models.SOC2Report(filename=filename, result=result)
+    vendor_domain = registrable_domain(result.get("extracted", {}).get("company_domain"))
+    report = models.SOC2Report(filename=filename, result=result, vendor_domain=vendor_domain)
     db.add(report)
+    db.flush()
+    sync_report_watchlist(db, [report])
     db.commit()
     db.refresh(report)
     return report
@@ -18,53 +29,523 @@ def get_all_reports(db: Session):
 def get_report_by_id(db: Session, report_id: int):
     return db.query(models.SOC2Report).filter(models.SOC2Report.id == report_id).first()
 
+# ——— Vendor watchlist ———
+def get_watchlist(db: Session, active_only: bool = False):
+    query = db.query(models.WatchlistEntry)
+    if active_only:
+        query = query.filter(models.WatchlistEntry.is_active.is_(True))
+    return query.order_by(models.WatchlistEntry.name, models.WatchlistEntry.id).all()
+
+def get_watchlist_entry(db: Session, entry_id: int):
+    return db.get(models.WatchlistEntry, entry_id)
+
+def normalize_watchlist_fields(fields: dict) -> dict:
+    if "vendor" in fields:
+        fields["vendor"] = cpe_name_part(fields["vendor"])
+    if "product" in fields:
+        fields["product"] = cpe_name_part(fields["product"])
+    if fields.get("keywords") is not None:
+        fields["keywords"] = sorted({k.strip().lower() for k in fields["keywords"] if k.strip()})
+    return fields
+
+def create_watchlist_entry(db: Session, fields: dict) -> models.WatchlistEntry:
+    entry = models.WatchlistEntry(source="manual", **normalize_watchlist_fields(dict(fields)))
+    db.add(entry)
+    db.commit()
+    db.refresh(entry)
+    return entry
+
+def update_watchlist_entry(db: Session, entry: models.WatchlistEntry, fields: dict) -> models.WatchlistEntry:
+    for k, v in normalize_watchlist_fields(dict(fields)).items():
+        setattr(entry, k, v)
+    db.commit()
+    db.refresh(entry)
+    return entry
+
+def delete_watchlist_entry(db: Session, entry: models.WatchlistEntry):
+    db.delete(entry)
+    db.commit()
+
+def sync_report_watchlist(db: Session, reports=None) -> int:
+    """
+    Add a 'soc2' watchlist entry for every reported vendor domain not yet on
+    the list (all reports by default). Existing entries, including their
+    thresholds and is_active flag, are left as the user configured them.
+    """
+    if reports is None:
+        reports = db.query(models.SOC2Report).filter(models.SOC2Report.vendor_domain.isnot(None)).all()
+    rows = {}
+    for r in reports:
+        extracted = (r.result or {}).get("extracted", {})
+        fields = report_vendor(extracted.get("company_name"), r.vendor_domain or extracted.get("company_domain"))
+        if fields:
+            rows.setdefault(fields["vendor_domain"], fields)
+    if not rows:
+        return 0
+    table = models.WatchlistEntry.__table__
+    stmt = pg_insert(table).values([
+        {**fields, "source": "soc2", "min_cvss_score": DEFAULT_MIN_CVSS_SCORE,
+         "is_active": True, "created_at": datetime.utcnow()}
+        for fields in rows.values()
+    ])
+    stmt = stmt.on_conflict_do_nothing(
+        index_elements=[table.c.vendor_domain],
+        index_where=table.c.source == "soc2",
+    )
+    return db.execute(stmt).rowcount
+
 # ——— Breach CRUD ———
-def upsert_breach(db: Session, breach_data: dict):
-    existing = db.query(models.Breach).filter(models.Breach.name == breach_data["name"]).first()
-    if existing:
-        for k, v in breach_data.items():
-            setattr(existing, k, v)
-        db.commit()
-        return existing
-    else:
-        breach = models.Breach(**breach_data)
-        db.add(breach)
-        db.commit()
-        db.refresh(breach)
-        return breach
+def bulk_upsert_breaches(
+    db: Session,
+    breaches: list[dict],
+    batch_size: int = BREACH_UPSERT_BATCH_SIZE,
+    commit: bool = True,
+) -> dict:
+    """
+    Upsert breaches with one INSERT ... ON CONFLICT (name) statement per batch,
+    all inside a single transaction. Rows whose columns are unchanged are skipped
+    by the DO UPDATE ... WHERE clause, so they are neither rewritten nor returned.
+    Every inserted/updated row is appended to the breach_changes log.
+    """
+    # ON CONFLICT cannot touch the same row twice in one statement
+    rows = list({b["name"]: b for b in breaches if b.get("name")}.values())
+    if not rows:
+        return {"inserted": 0, "updated": 0, "unchanged": 0}
+
+    table = models.Breach.__table__
+    update_cols = [c for c in rows[0].keys() if c != "name"]
+
+    inserted = updated = 0
+    try:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            stmt = pg_insert(table).values(batch)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.name],
+                set_={c: stmt.excluded[c] for c in update_cols},
+                where=tuple_(*[table.c[c] for c in update_cols]).is_distinct_from(
+                    tuple_(*[stmt.excluded[c] for c in update_cols])
+                ),
+            ).returning(
+                table.c.name,
+                table.c.content_hash,
+                literal_column("(xmax = 0)").label("inserted"),
+            )
+            changes = []
+            for name, content_hash, was_inserted in db.execute(stmt):
+                if was_inserted:
+                    inserted += 1
+                else:
+                    updated += 1
+                changes.append({
+                    "breach_name": name,
+                    "change_type": "inserted" if was_inserted else "updated",
+                    "content_hash": content_hash,
+                })
+            if changes:
+                db.execute(models.BreachChange.__table__.insert(), changes)
+        if commit:
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": len(rows) - inserted - updated,
+    }
+
+def get_breach_hashes(db: Session) -> dict:
+    return dict(db.query(models.Breach.name, models.Breach.content_hash).all())
 
-def search_breaches(db: Session, term: str, limit: int):
-    pattern = f"%{term.lower()}%"
+def get_breach_changes(db: Session, since_id: int, limit: int):
     return (
-        db.query(models.Breach)
-        .filter(
-            (models.Breach.name.ilike(pattern)) |
-            (models.Breach.title.ilike(pattern)) |
-            (models.Breach.domain.ilike(pattern)) |
-            (models.Breach.description.ilike(pattern))
-        )
-        .order_by(models.Breach.pwn_count.desc())
+        db.query(models.BreachChange)
+        .filter(models.BreachChange.id > since_id)
+        .order_by(models.BreachChange.id)
         .limit(limit)
         .all()
     )
 
+BREACH_SEARCH_MODES = ("auto", "fulltext", "fuzzy", "substring")
+
+def _breach_search_query(
+    db: Session,
+    term: str,
+    mode: str,
+    data_class_ids: list[int] | None = None,
+    match_all: bool = False,
+):
+    """
+    Build the filtered breach query and its relevance expression.
+
+    - fulltext: websearch query against the weighted search_vector (GIN)
+    - fuzzy: pg_trgm similarity on name/domain (GIN trigram indexes)
+    - auto: fulltext OR fuzzy, ranked by the sum of both scores
+    - substring: the legacy ILIKE scan, kept for exact-substring needs
+
+    data_class_ids restricts results to breaches exposing any (or, with
+    match_all, every) of the given classes via the GIN-indexed array.
+    """
+    Breach = models.Breach
+    if mode == "substring":
+        pattern = f"%{term.lower()}%"
+        match = (
+            (Breach.name.ilike(pattern)) |
+            (Breach.title.ilike(pattern)) |
+            (Breach.domain.ilike(pattern)) |
+            (Breach.description.ilike(pattern))
+        )
+        rank = None
+    else:
+        tsquery = func.websearch_to_tsquery("english", term)
+        text_match = Breach.search_vector.op("@@")(tsquery)
+        text_rank = func.ts_rank_cd(Breach.search_vector, tsquery)
+        fuzzy_match = Breach.name.op("%")(term) | Breach.domain.op("%")(term)
+        fuzzy_rank = func.greatest(
+            func.similarity(Breach.name, term),
+            func.coalesce(func.similarity(Breach.domain, term), 0),
+        )
+        if mode == "fulltext":
+            match, rank = text_match, text_rank
+        elif mode == "fuzzy":
+            match, rank = fuzzy_match, fuzzy_rank
+        else:
+            match, rank = text_match | fuzzy_match, text_rank + fuzzy_rank
+
+    query = db.query(Breach).filter(match)
+    if data_class_ids:
+        wanted = cast(sorted(data_class_ids), ARRAY(Integer))
+        if match_all:
+            query = query.filter(Breach.data_class_ids.contains(wanted))
+        else:
+            query = query.filter(Breach.data_class_ids.overlap(wanted))
+    return query, rank
+
+def search_breach_ids(
+    db: Session,
+    term: str,
+    limit: int,
+    mode: str = "auto",
+    data_class_ids: list[int] | None = None,
+    match_all: bool = False,
+) -> list[int]:
+    """Ids of matching breaches ranked by relevance, then pwn_count (rendered from the snapshot)."""
+    query, rank = _breach_search_query(db, term, mode, data_class_ids, match_all)
+    order = [models.Breach.pwn_count.desc().nullslast(), models.Breach.id]
+    if rank is not None:
+        order.insert(0, rank.desc())
+    return [i for (i,) in query.with_entities(models.Breach.id).order_by(*order).limit(limit)]
+
+def get_data_class_facets(
+    db: Session,
+    term: str,
+    mode: str = "auto",
+    data_class_ids: list[int] | None = None,
+    match_all: bool = False,
+) -> dict:
+    """Count matching breaches per data class in one unnest/GROUP BY query."""
+    query, _ = _breach_search_query(db, term, mode, data_class_ids, match_all)
+    exposed = query.with_entities(func.unnest(models.Breach.data_class_ids).label("class_id")).subquery()
+    counted = (
+        db.query(exposed.c.class_id, func.count().label("n"))
+        .group_by(exposed.c.class_id)
+        .subquery()
+    )
+    rows = (
+        db.query(models.DataClass.name, counted.c.n)
+        .join(counted, counted.c.class_id == models.DataClass.id)
+        .order_by(counted.c.n.desc(), models.DataClass.name)
+        .all()
+    )
+    return {name: n for name, n in rows}
+
+# ——— Data classes ———
+def get_data_classes(db: Session) -> dict:
+    """Return the {name: id} data-class dictionary."""
+    return dict(db.query(models.DataClass.name, models.DataClass.id).all())
+
+def ensure_data_classes(db: Session, names) -> dict:
+    """Insert any unseen data-class names and return the full {name: id} dictionary."""
+    names = sorted({n for n in names if n})
+    if names:
+        db.execute(
+            pg_insert(models.DataClass.__table__)
+            .values([{"name": n} for n in names])
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+    return get_data_classes(db)
+
+def split_data_classes(value: str | None) -> list[str]:
+    return [c for c in (value or "").split(";") if c]
+
+def get_all_breaches(db: Session):
+    return db.query(models.Breach).order_by(models.Breach.pwn_count.desc().nullslast(), models.Breach.id).all()
+
 def get_breach_by_id(db: Session, breach_id: int):
     return db.query(models.Breach).filter(models.Breach.id == breach_id).first()
 
-def get_breaches_by_domain(db: Session, domain: str):
-    return (
+def get_breaches_by_ids(db: Session, breach_ids: list[int]):
+    return db.query(models.Breach).filter(models.Breach.id.in_(breach_ids)).all()
+
+def get_domain_exposure(db: Session, registrable_domains: list[str]) -> dict:
+    """
+    Summarize breaches for many registrable domains with one
+    GROUP BY ... WHERE registrable_domain = ANY(:domains) query.
+    """
+    if not registrable_domains:
+        return {}
+    Breach = models.Breach
+    rows = (
+        db.query(
+            Breach.registrable_domain,
+            func.count(),
+            func.coalesce(func.sum(Breach.pwn_count), 0),
+            func.max(Breach.breach_date),
+            func.string_agg(Breach.data_classes, ";"),
+        )
+        .filter(Breach.registrable_domain == func.any(cast(registrable_domains, ARRAY(String))))
+        .group_by(Breach.registrable_domain)
+        .all()
+    )
+    return {
+        domain: {
+            "breach_count": count,
+            "total_pwned": int(pwned),
+            "latest_breach_date": str(latest) if latest else None,
+            "data_classes": sorted(set(split_data_classes(classes))),
+        }
+        for domain, count, pwned, latest, classes in rows
+    }
+
+def backfill_derived_columns(db: Session) -> int:
+    """Fill normalized domain and data-class columns for rows written before they existed."""
+    updated = 0
+    breaches = (
         db.query(models.Breach)
-        .filter(models.Breach.domain.ilike(f"%{domain}%"))
-        .order_by(models.Breach.pwn_count.desc())
+        .filter(models.Breach.domain_key.is_(None), models.Breach.domain != "")
+        .all()
+    )
+    for b in breaches:
+        b.registrable_domain = registrable_domain(b.domain)
+        # '' marks a domain that does not normalize, so it is not picked up again
+        b.domain_key = reversed_domain_key(b.domain) or ""
+        updated += 1
+    pending = (
+        db.query(models.Breach)
+        .filter(models.Breach.data_class_ids.is_(None), models.Breach.data_classes != "")
+        .all()
+    )
+    if pending:
+        class_ids = ensure_data_classes(
+            db, (c for b in pending for c in split_data_classes(b.data_classes))
+        )
+        for b in pending:
+            b.data_class_ids = sorted({class_ids[c] for c in split_data_classes(b.data_classes)})
+            updated += 1
+    reports = db.query(models.SOC2Report).filter(models.SOC2Report.vendor_domain.is_(None)).all()
+    for r in reports:
+        domain = registrable_domain((r.result or {}).get("extracted", {}).get("company_domain"))
+        if domain:
+            r.vendor_domain = domain
+            updated += 1
+    updated += sync_report_watchlist(db)
+    if pending:
+        refresh_breach_stats(db, commit=False)
+    db.commit()
+    return updated
+
+def backfill_cve_typed_columns(db: Session, batch_size: int = CVE_BACKFILL_BATCH_SIZE) -> int:
+    """
+    Copy the <name>_legacy text columns left by the cves retype patch into
+    the typed columns, one id range per transaction, then drop them. Only
+    unconverted rows have "references" IS NULL (syncs always write a list),
+    so an interrupted run resumes where it stopped and never overwrites a
+    row that has been re-synced since.
+    """
+    legacy = [
+        name for (name,) in db.execute(text(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = 'cves' "
+            "AND column_name LIKE '%\\_legacy'"
+        ))
+    ]
+    if not legacy:
+        return 0
+    present = {name[:-len("_legacy")] for name in legacy}
+    assignments = []
+    for name, values in models.CVSS_V3_ENUMS.items():
+        if name in present:
+            labels = ", ".join(f"'{v}'" for v in values)
+            assignments.append(f'"{name}" = array_position(ARRAY[{labels}], upper("{name}_legacy"))')
+    for name in ("references", "version_affected"):
+        if name in present:
+            assignments.append(
+                f'"{name}" = CASE WHEN coalesce("{name}_legacy", \'\') = \'\' THEN \'{{}}\'::text[] '
+                f'ELSE ARRAY(SELECT jsonb_array_elements_text("{name}_legacy"::jsonb)) END'
+            )
+
+    updated = 0
+    low, high = db.execute(text('SELECT min(id), max(id) FROM cves WHERE "references" IS NULL')).one()
+    if low is not None and assignments:
+        stmt = text(
+            f"UPDATE cves SET {', '.join(assignments)} "
+            'WHERE id >= :low AND id < :high AND "references" IS NULL'
+        )
+        for start in range(low, high + 1, batch_size):
+            updated += db.execute(stmt, {"low": start, "high": start + batch_size}).rowcount
+            db.commit()
+    db.execute(text("ALTER TABLE cves " + ", ".join(f'DROP COLUMN "{name}"' for name in legacy)))
+    db.commit()
+    return updated
+
+def backfill_cve_cpe_matches(db: Session, batch_size: int = CVE_BACKFILL_BATCH_SIZE) -> int:
+    """
+    Build cve_cpe_matches rows for CVEs stored before the table existed, from
+    their version_affected criteria, one id range per transaction. Only CVEs
+    with criteria and no match rows are read, so an interrupted run resumes.
+    The stored criteria lack NVD's versionStart/End bounds: wildcard versions
+    get an unbounded range until the CVE is next modified and re-synced.
+    """
+    CVE, CpeMatch = models.CVE, models.CpeMatch
+    pending = (
+        select(CVE.id, CVE.cve_id, CVE.version_affected)
+        .where(
+            func.cardinality(CVE.version_affected) > 0,
+            ~exists().where(CpeMatch.cve_id == CVE.cve_id),
+        )
+        .order_by(CVE.id)
+    )
+    inserted, after = 0, 0
+    while True:
+        cves = db.execute(pending.where(CVE.id > after).limit(batch_size)).all()
+        if not cves:
+            return inserted
+        rows = [
+            row
+            for _, cve_id, criteria in cves
+            for row in (cpe_match_row(cve_id, c) for c in criteria)
+            if row is not None
+        ]
+        if rows:
+            db.execute(CpeMatch.__table__.insert(), rows)
+        db.commit()
+        inserted += len(rows)
+        after = cves[-1].id
+
+BREACH_STATS_KEY = "hibp"
+TOP_DOMAINS_LIMIT = 10
+
+def get_breach_stats(db: Session) -> dict:
+    """Compute totals and breakdowns with SQL aggregates (no per-row fetches)."""
+    Breach = models.Breach
+    pwned = func.coalesce(func.sum(Breach.pwn_count), 0)
+    totals = db.query(
+        func.count().label("total_breaches"),
+        pwned.label("total_pwned_accounts"),
+        func.count().filter(Breach.is_verified.is_(True)).label("verified_count"),
+        func.count().filter(Breach.is_sensitive.is_(True)).label("sensitive_count"),
+        func.count().filter(Breach.is_fabricated.is_(True)).label("fabricated_count"),
+        func.count().filter(Breach.is_spam_list.is_(True)).label("spam_list_count"),
+        func.count().filter(Breach.is_retired.is_(True)).label("retired_count"),
+    ).one()
+
+    year = func.extract("year", Breach.breach_date).label("year")
+    by_year = (
+        db.query(year, func.count(), pwned)
+        .filter(Breach.breach_date.isnot(None))
+        .group_by(year)
+        .order_by(year)
+        .all()
+    )
+
+    exposed = db.query(func.unnest(Breach.data_class_ids).label("class_id")).subquery()
+    by_data_class = (
+        db.query(models.DataClass.name, func.count())
+        .join(exposed, exposed.c.class_id == models.DataClass.id)
+        .group_by(models.DataClass.name)
+        .order_by(func.count().desc(), models.DataClass.name)
+        .all()
+    )
+
+    top_domains = (
+        db.query(Breach.registrable_domain, func.count(), pwned)
+        .filter(Breach.registrable_domain.isnot(None))
+        .group_by(Breach.registrable_domain)
+        .order_by(pwned.desc())
+        .limit(TOP_DOMAINS_LIMIT)
         .all()
     )
 
-def get_breach_stats(db: Session):
-    total_breaches = db.query(models.Breach).count()
-    total_accounts = [row[0] for row in db.query(models.Breach.pwn_count).all() if row[0]]
-    total_pwned = sum(total_accounts)
     return {
-        "total_breaches": total_breaches,
-        "total_pwned_accounts": total_pwned,
-        "last_updated": datetime.utcnow().isoformat()
+        **totals._asdict(),
+        "by_year": [
+            {"year": int(y), "breaches": n, "pwned_accounts": int(p)} for y, n, p in by_year
+        ],
+        "by_data_class": {name: n for name, n in by_data_class},
+        "top_domains": [
+            {"domain": d, "breaches": n, "pwned_accounts": int(p)} for d, n, p in top_domains
+        ],
+        "last_updated": datetime.utcnow().isoformat(),
     }
+
+def refresh_breach_stats(db: Session, commit: bool = True) -> dict:
+    """Recompute the stats rollup and store it in breach_stats."""
+    payload = get_breach_stats(db)
+    stmt = pg_insert(models.BreachStatsCache.__table__).values(
+        key=BREACH_STATS_KEY, payload=payload, computed_at=datetime.utcnow()
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["key"],
+        set_={"payload": stmt.excluded.payload, "computed_at": stmt.excluded.computed_at},
+    ))
+    if commit:
+        db.commit()
+    return payload
+
+def get_cached_breach_stats(db: Session) -> dict:
+    cached = db.get(models.BreachStatsCache, BREACH_STATS_KEY)
+    if cached is None:
+        return refresh_breach_stats(db)
+    return cached.payload
+
+# ——— Sync state ———
+def get_sync_state(db: Session, source: str) -> models.SyncState | None:
+    return db.get(models.SyncState, source)
+
+def save_sync_state(db: Session, source: str, bump_version: bool = False, **fields) -> models.SyncState:
+    state = db.get(models.SyncState, source)
+    if state is None:
+        state = models.SyncState(source=source, version=0)
+        db.add(state)
+    for k, v in fields.items():
+        setattr(state, k, v)
+    if bump_version:
+        state.version = (state.version or 0) + 1
+    state.last_synced_at = datetime.utcnow()
+    return state
+
+def bump_sync_version(db: Session, source: str):
+    """Signal other workers that data behind `source` changed outside a sync."""
+    state = db.get(models.SyncState, source)
+    if state is None:
+        db.add(models.SyncState(source=source, version=1))
+    else:
+        state.version = (state.version or 0) + 1
+
+def get_sync_jobs(db: Session, source: str | None = None, status: str | None = None, limit: int = 50) -> list[models.SyncJob]:
+    q = db.query(models.SyncJob)
+    if source:
+        q = q.filter(models.SyncJob.source == source)
+    if status:
+        q = q.filter(models.SyncJob.status == status)
+    return q.order_by(models.SyncJob.created_at.desc(), models.SyncJob.id.desc()).limit(limit).all()
+
+def get_sync_version(db: Session, source: str) -> int:
+    version = (
+        db.query(models.SyncState.version)
+        .filter(models.SyncState.source == source)
+        .scalar()
+    )
+    return version or 0
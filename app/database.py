@@ -1,7 +1,10 @@
 # app/database.py
 
 import os
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from sqlalchemy import create_engine, func, make_url, select, text
+from sqlalchemy.exc import DatabaseError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from core.config import DATABASE_URL  # import from config
 
@@ -12,6 +15,26 @@ engine = create_engine(DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+def async_database_url(url: str):
+    """DATABASE_URL through asyncpg; asyncpg calls libpq's sslmode `ssl`."""
+    url = make_url(url).set(drivername="postgresql+asyncpg")
+    if "sslmode" in url.query:
+        query = dict(url.query)
+        query["ssl"] = query.pop("sslmode")
+        url = url.set(query=query)
+    return url
+
+# Used by the async read endpoints; writes and background jobs stay on `engine`
+async_engine = create_async_engine(
+    async_database_url(DATABASE_URL),
+    pool_pre_ping=True,
+    # asyncpg caches prepared statements, and Postgres switches those to a
+    # generic plan after five runs; ranked full-text and range queries need
+    # plans for the actual values, as psycopg2's inlined parameters got
+    connect_args={"server_settings": {"plan_cache_mode": "force_custom_plan"}},
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
 
 
 
@@ -20,15 +43,44 @@ from sqlalchemy_utils import database_exists, create_database
 
 # Check and create DB if needed (only do this in dev/local)
 if not database_exists(engine.url):
-    create_database(engine.url)
-    print("Database created successfully.")
+    try:
+        create_database(engine.url)
+        print("Database created successfully.")
+    except DatabaseError:
+        # the API and the sync worker start together; another process may have won
+        if not database_exists(engine.url):
+            raise
+        print("Database already exists.")
 else:
     print("Database already exists.")
     
 #? end
 
+# Extensions and types must exist before create_all() builds columns/indexes that use them
+SCHEMA_EXTENSIONS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # ranges over version sort keys (see services/cpe_matching.py), compared bytewise
+    """DO $$ BEGIN
+        CREATE TYPE version_range AS RANGE (subtype = text, collation = "C");
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$""",
+]
+
+# Held while init_db() runs: uvicorn workers and the sync worker start together, and
+# concurrent CREATE EXTENSION/create_all or cves column renames fail in all but one
+SCHEMA_LOCK = "init-db"
+
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    from .models import SCHEMA_PATCHES
+
+    with advisory_lock(SCHEMA_LOCK, wait=True):
+        with engine.begin() as conn:
+            for stmt in SCHEMA_EXTENSIONS:
+                conn.execute(text(stmt))
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            for stmt in SCHEMA_PATCHES:
+                conn.execute(text(stmt))
 
 def get_db():
     db = SessionLocal()
@@ -36,3 +88,39 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def advisory_lock_held(name: str) -> bool:
+    """Whether any session currently holds the advisory lock `name`."""
+    with engine.connect() as conn:
+        # a bigint key shows up split into classid (high half) and objid (low half)
+        return conn.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_locks, (SELECT hashtext(:name)::bigint AS key) k "
+            "WHERE locktype = 'advisory' AND granted AND objsubid = 1 "
+            "AND classid = ((k.key >> 32) & 4294967295)::oid AND objid = (k.key & 4294967295)::oid)"
+        ), {"name": name}).scalar()
+
+@contextmanager
+def advisory_lock(name: str, wait: bool = False):
+    """
+    Try to take a cluster-wide session advisory lock without waiting (or,
+    with wait=True, block until it is free) and yield whether it was
+    acquired. The lock lives on a dedicated autocommit connection, so it is
+    held for the whole block without keeping a transaction open, and is
+    released if the process dies.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        key = func.hashtext(name)
+        if wait:
+            conn.execute(select(func.pg_advisory_lock(key)))
+            acquired = True
+        else:
+            acquired = conn.execute(select(func.pg_try_advisory_lock(key))).scalar()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.execute(select(func.pg_advisory_unlock(key)))
@@ -7,11 +7,14 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .database import init_db, get_db
-from .routers import reports, breaches
+from .database import init_db, get_db, SessionLocal, advisory_lock, async_engine, engine
+from . import crud
+from .routers import reports, breaches, watchlist, sync_jobs, diagnostics
+from .services import alert_stream, instrumentation
 import app.security_vulnerability as security_vulnerability
 # from app.core.config import DATABASE_URL, API_KEY  # import from config
 from core.config import DATABASE_URL, API_KEY  # import from config
+from core.config import INSTRUMENTATION_ENABLED, LOOP_BLOCK_THRESHOLD_MS, SLOW_REQUEST_MS
 
 # DATABASE_URL = os.getenv("DATABASE_URL")
 # API_KEY = os.getenv("PERPLEXITY_API_KEY")
@@ -26,8 +29,23 @@ if not DATABASE_URL or not API_KEY:
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
+    with SessionLocal() as db:
+        crud.backfill_derived_columns(db)
+        # several uvicorn workers start at once; one of them runs each backfill
+        with advisory_lock("cve-retype-backfill") as acquired:
+            if acquired:
+                crud.backfill_cve_typed_columns(db)
+        with advisory_lock("cpe-match-backfill") as acquired:
+            if acquired:
+                crud.backfill_cve_cpe_matches(db)
     print("Database initialized")
+    alert_stream.start_alert_listener(engine)
+    if INSTRUMENTATION_ENABLED:
+        instrumentation.start_loop_monitor(LOOP_BLOCK_THRESHOLD_MS)
     yield
+    await instrumentation.stop_loop_monitor()
+    alert_stream.stop_alert_listener()
+    await async_engine.dispose()
     print("Application shutting down")
 
 app = FastAPI(lifespan=lifespan)
@@ -37,12 +55,20 @@ app.add_middleware(
     allow_origins=["*"],        # In production, restrict this to specific domains
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # keyset cursor of /api/vulnerabilities
     allow_credentials=True,
 )
 
+if INSTRUMENTATION_ENABLED:
+    app.add_middleware(instrumentation.RequestTimingMiddleware, slow_request_ms=SLOW_REQUEST_MS)
+
 # Include routers
 app.include_router(reports.router, prefix="/reports", tags=["reports"])
 app.include_router(breaches.router, prefix="/breaches", tags=["breaches"])
+app.include_router(watchlist.router, prefix="/watchlist", tags=["watchlist"])
+app.include_router(sync_jobs.router, prefix="/sync-jobs", tags=["sync-jobs"])
+if INSTRUMENTATION_ENABLED:
+    app.include_router(diagnostics.router, prefix="/diagnostics", tags=["diagnostics"])
 
 # Register vulnerability routes
 security_vulnerability.register_vulnerability_routes(app)
@@ -1,17 +1,79 @@
 # app/models.py
 
-from sqlalchemy import Column, Integer, Text, DateTime, String, Date, Boolean, Float
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import (
+    BigInteger, Column, Integer, SmallInteger, Text, DateTime, String, Date, Boolean, Float, Computed, Index,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR
+from sqlalchemy.orm import deferred
+from sqlalchemy.types import TypeDecorator, UserDefinedType
 from datetime import datetime
 
 from .database import Base
 
+# Weighted document for breach full-text search: name/title (A), domain (B), description (C)
+BREACH_SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(domain, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+# Weighted document for CVE full-text search: id (A), CPE vendor:product pairs (B), description (C)
+CVE_SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', coalesce(cve_id, '')), 'A') || "
+    "setweight(to_tsvector('simple', translate(coalesce(vendor_project, ''), ':|_', '   ')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+class VersionRange(UserDefinedType):
+    """Postgres `version_range` (a range over version sort keys); values are range literals."""
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "version_range"
+
+class CodedEnum(TypeDecorator):
+    """
+    One of a fixed tuple of strings, stored as its 1-based position in a
+    SMALLINT. Values outside the tuple are stored as NULL.
+    """
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, values: tuple):
+        super().__init__()
+        self.values = values
+        self._codes = {v: n for n, v in enumerate(values, 1)}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return self._codes.get(value.upper())
+
+    def process_result_value(self, value, dialect):
+        return self.values[value - 1] if value else None
+
+# CVSS v3 enumerations as NVD spells them; the order defines the stored codes,
+# so only ever append.
+CVSS_V3_ENUMS = {
+    "cvss_v3_severity": ("NONE", "LOW", "MEDIUM", "HIGH", "CRITICAL"),
+    "attack_vector": ("NETWORK", "ADJACENT_NETWORK", "LOCAL", "PHYSICAL"),
+    "attack_complexity": ("LOW", "HIGH"),
+    "privileges_required": ("NONE", "LOW", "HIGH"),
+    "user_interaction": ("NONE", "REQUIRED"),
+    "scope": ("UNCHANGED", "CHANGED"),
+    "confidentiality_impact": ("NONE", "LOW", "HIGH"),
+    "integrity_impact": ("NONE", "LOW", "HIGH"),
+    "availability_impact": ("NONE", "LOW", "HIGH"),
+}
+
 class SOC2Report(Base):
     __tablename__ = "soc2_reports"
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(Text, nullable=False)
     result = Column(JSONB, nullable=False)
+    vendor_domain = Column(String, index=True)  # registrable domain (eTLD+1) of company_domain
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 class Breach(Base):
@@ -21,16 +83,93 @@ class Breach(Base):
     name = Column(String, unique=True, index=True)
     title = Column(String)
     domain = Column(String, index=True)
+    registrable_domain = Column(String, index=True)  # eTLD+1, e.g. 'example.co.uk'
+    domain_key = Column(String)  # reversed labels, e.g. 'uk.co.example.mail'; '' if the domain does not normalize
     breach_date = Column(Date)
     added_date = Column(Date)
     pwn_count = Column(Integer)
     description = Column(Text)
     data_classes = Column(Text)
+    data_class_ids = Column(ARRAY(Integer))  # sorted DataClass ids, mirrors data_classes
     is_verified = Column(Boolean, default=False)
     is_fabricated = Column(Boolean, default=False)
     is_sensitive = Column(Boolean, default=False)
     is_retired = Column(Boolean, default=False)
     is_spam_list = Column(Boolean, default=False)
+    content_hash = Column(String(64))  # sha256 of the normalized HIBP record
+    search_vector = Column(TSVECTOR, Computed(BREACH_SEARCH_VECTOR_SQL, persisted=True))
+
+    __table_args__ = (
+        Index("ix_breaches_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_breaches_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_breaches_domain_trgm", "domain", postgresql_using="gin", postgresql_ops={"domain": "gin_trgm_ops"}),
+        Index("ix_breaches_data_class_ids", "data_class_ids", postgresql_using="gin"),
+    )
+
+class DataClass(Base):
+    __tablename__ = "data_classes"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)  # e.g. 'Passwords', 'Credit cards'
+
+class BreachChange(Base):
+    __tablename__ = "breach_changes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    breach_name = Column(String, index=True, nullable=False)
+    change_type = Column(String, nullable=False)  # 'inserted', 'updated'
+    content_hash = Column(String(64))
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class BreachStatsCache(Base):
+    __tablename__ = "breach_stats"
+
+    key = Column(String, primary_key=True)
+    payload = Column(JSONB, nullable=False)  # schemas.BreachStats as a dict
+    computed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class RateLimitBucket(Base):
+    """Token bucket shared by every worker; refilled lazily from the DB clock on each take."""
+    __tablename__ = "rate_limit_buckets"
+
+    name = Column(String, primary_key=True)  # e.g. 'nvd:public'
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)  # compared with clock_timestamp()
+
+class SyncState(Base):
+    __tablename__ = "sync_state"
+
+    source = Column(String, primary_key=True)  # e.g. 'hibp'
+    etag = Column(String)
+    last_modified = Column(String)  # raw Last-Modified header, echoed back as If-Modified-Since
+    last_synced_at = Column(DateTime)
+    version = Column(Integer, default=0, nullable=False)  # bumped whenever the synced data changes
+    watermark = Column(DateTime)  # upper bound of the last fully synced window (NVD lastModified)
+
+class SyncJob(Base):
+    """One run of an upstream sync ('nvd', 'hibp' or the 'nvd-feeds' file import), executed by the sync worker (app/sync_worker.py)."""
+    __tablename__ = "sync_jobs"
+
+    id = Column(Integer, primary_key=True)
+    source = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued")  # queued, running, succeeded, failed
+    trigger = Column(String, nullable=False, default="api")  # 'api' or 'schedule'
+    params = Column(JSONB, nullable=False, default=dict)  # keyword arguments of the sync
+    result = Column(JSONB)  # counts returned by the sync
+    error = Column(Text)
+    worker = Column(String)  # '<host>:<pid>' of the worker that ran it
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        # at most one queued or running job per source
+        Index(
+            "ux_sync_jobs_active_source", "source",
+            unique=True, postgresql_where=status.in_(["queued", "running"]),
+        ),
+        Index("ix_sync_jobs_source_created", "source", created_at.desc()),
+    )
 
 class CVE(Base):
     __tablename__ = "cves"
@@ -41,23 +180,93 @@ class CVE(Base):
     published_date = Column(DateTime)
     last_modified = Column(DateTime)
     cvss_v3_score = Column(Float)
-    cvss_v3_severity = Column(String)
+    cvss_v3_severity = Column(CodedEnum(CVSS_V3_ENUMS["cvss_v3_severity"]))
     cvss_v2_score = Column(Float)
     vendor_project = Column(String, index=True)
     product = Column(String, index=True)
-    version_affected = Column(Text)
-    cwe_id = Column(String)  # Common Weakness Enumeration
-    references = Column(Text)  # JSON string of reference URLs
-    attack_vector = Column(String)
-    attack_complexity = Column(String)
-    privileges_required = Column(String)
-    user_interaction = Column(String)
-    scope = Column(String)
-    confidentiality_impact = Column(String)
-    integrity_impact = Column(String)
-    availability_impact = Column(String)
+    version_affected = Column(ARRAY(Text))  # vulnerable CPE criteria
+    cwe_id = Column(String, index=True)  # Common Weakness Enumeration
+    references = Column(ARRAY(Text))  # reference URLs
+    attack_vector = Column(CodedEnum(CVSS_V3_ENUMS["attack_vector"]), index=True)
+    attack_complexity = Column(CodedEnum(CVSS_V3_ENUMS["attack_complexity"]))
+    privileges_required = Column(CodedEnum(CVSS_V3_ENUMS["privileges_required"]))
+    user_interaction = Column(CodedEnum(CVSS_V3_ENUMS["user_interaction"]))
+    scope = Column(CodedEnum(CVSS_V3_ENUMS["scope"]))
+    confidentiality_impact = Column(CodedEnum(CVSS_V3_ENUMS["confidentiality_impact"]))
+    integrity_impact = Column(CodedEnum(CVSS_V3_ENUMS["integrity_impact"]))
+    availability_impact = Column(CodedEnum(CVSS_V3_ENUMS["availability_impact"]))
     is_analyzed = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # deferred so listing queries don't ship the tsvector with every row
+    search_vector = deferred(Column(TSVECTOR, Computed(CVE_SEARCH_VECTOR_SQL, persisted=True)))
+
+    # Keyset pages walk (published_date DESC NULLS LAST, id DESC); each index
+    # below serves that order for one filter combination of /api/vulnerabilities.
+    __table_args__ = (
+        Index("ix_cves_published_id", published_date.desc().nulls_last(), id.desc()),
+        Index(
+            "ix_cves_severity_published_id",
+            cvss_v3_severity, published_date.desc().nulls_last(), id.desc(),
+        ),
+        Index(
+            "ix_cves_unanalyzed_published_id",
+            published_date.desc().nulls_last(), id.desc(),
+            postgresql_where=is_analyzed == False,
+        ),
+        Index("ix_cves_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+class CpeMatch(Base):
+    __tablename__ = "cve_cpe_matches"
+
+    id = Column(Integer, primary_key=True)
+    cve_id = Column(String, index=True, nullable=False)
+    vendor = Column(String, nullable=False)
+    product = Column(String, nullable=False)
+    criteria = Column(String, nullable=False)  # full cpe:2.3 string
+    version_start = Column(String)
+    version_start_inclusive = Column(Boolean, default=True)
+    version_end = Column(String)
+    version_end_inclusive = Column(Boolean, default=False)
+    versions = Column(VersionRange, nullable=False)  # affected interval over version sort keys
+
+    __table_args__ = (
+        Index("ix_cve_cpe_matches_vendor_product", "vendor", "product"),
+        Index("ix_cve_cpe_matches_vendor_cve", "vendor", "cve_id"),
+        Index("ix_cve_cpe_matches_product", "product"),
+        Index("ix_cve_cpe_matches_versions", "versions", postgresql_using="gist"),
+    )
+
+class NVDFeedImport(Base):
+    __tablename__ = "nvd_feed_imports"
+
+    filename = Column(String, primary_key=True)  # basename, e.g. 'nvdcve-2.0-2019.json.gz'
+    file_size = Column(BigInteger, nullable=False)  # a different size restarts the file
+    items_done = Column(Integer, default=0, nullable=False)  # feed items committed so far
+    started_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime)
+
+class WatchlistEntry(Base):
+    __tablename__ = "vendor_watchlist"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)  # display name, e.g. 'Atlassian'
+    vendor = Column(String)  # CPE 2.3 vendor, e.g. 'atlassian'
+    product = Column(String)  # CPE 2.3 product; NULL watches every product of the vendor
+    keywords = Column(ARRAY(Text))  # matched as whole words in CVE descriptions
+    min_cvss_score = Column(Float, nullable=False, default=7.0)  # alert at or above this score
+    source = Column(String, nullable=False, default="manual")  # 'manual' or 'soc2'
+    vendor_domain = Column(String)  # registrable domain, set for 'soc2' entries
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # one derived entry per reported vendor
+        Index(
+            "ux_vendor_watchlist_soc2_domain", "vendor_domain",
+            unique=True, postgresql_where=source == "soc2",
+        ),
+    )
 
 class VulnerabilityAlert(Base):
     __tablename__ = "vulnerability_alerts"
@@ -66,5 +275,114 @@ class VulnerabilityAlert(Base):
     cve_id = Column(String, index=True)
     alert_type = Column(String)  # 'critical', 'high_priority', 'trending'
     message = Column(Text)
+    watchlist_entry_id = Column(Integer, index=True)  # set for 'watchlist' alerts
+    vendor = Column(String)  # watched vendor's display name
+    severity = Column(String)  # CVSS v3 severity of the CVE when alerted
+    cvss_v3_score = Column(Float)
+    dedup_key = Column(String, unique=True)  # '<type>:<watchlist entry>:<cve>', see alert_pipeline
     is_read = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_vulnerability_alerts_created_id", created_at.desc(), id.desc()),
+    )
+
+class AlertDigest(Base):
+    """Watchlist alerts folded per vendor entry and severity over one time window."""
+    __tablename__ = "vulnerability_alert_digests"
+
+    id = Column(Integer, primary_key=True)
+    watchlist_entry_id = Column(Integer, nullable=False)
+    vendor = Column(String)
+    severity = Column(String, nullable=False)
+    window_start = Column(DateTime, nullable=False)
+    window_minutes = Column(Integer, nullable=False)
+    alert_count = Column(Integer, nullable=False, default=0)
+    max_cvss_score = Column(Float)
+    cve_ids = Column(ARRAY(Text), nullable=False)
+    is_read = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index(
+            "ux_vulnerability_alert_digests_window",
+            "watchlist_entry_id", "severity", "window_start", unique=True,
+        ),
+        Index("ix_vulnerability_alert_digests_window_id", window_start.desc(), id.desc()),
+    )
+
+# Columns of cves that used to be VARCHAR/TEXT, with their current SQL type
+CVE_TYPED_COLUMNS = {
+    **{name: "SMALLINT" for name in CVSS_V3_ENUMS},
+    "references": "TEXT[]",
+    "version_affected": "TEXT[]",
+}
+
+# create_all() only creates missing tables, so columns and indexes added to
+# existing tables are patched in here (statements must be idempotent).
+SCHEMA_PATCHES = [
+    "ALTER TABLE breaches ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "ALTER TABLE breaches ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS ({BREACH_SEARCH_VECTOR_SQL}) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_breaches_search_vector ON breaches USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_breaches_name_trgm ON breaches USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_breaches_domain_trgm ON breaches USING gin (domain gin_trgm_ops)",
+    "ALTER TABLE sync_state ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE sync_state ADD COLUMN IF NOT EXISTS watermark TIMESTAMP",
+    "ALTER TABLE breaches ADD COLUMN IF NOT EXISTS registrable_domain VARCHAR",
+    "ALTER TABLE breaches ADD COLUMN IF NOT EXISTS domain_key VARCHAR",
+    "CREATE INDEX IF NOT EXISTS ix_breaches_registrable_domain ON breaches (registrable_domain)",
+    "ALTER TABLE breaches ADD COLUMN IF NOT EXISTS data_class_ids INTEGER[]",
+    "CREATE INDEX IF NOT EXISTS ix_breaches_data_class_ids ON breaches USING gin (data_class_ids)",
+    # Move text-typed CVSS enums and JSON-in-text lists aside as <name>_legacy
+    # (dropping indexes on them so the new columns can reuse the names);
+    # crud.backfill_cve_typed_columns copies them over and drops them.
+    f"""DO $$
+    DECLARE col text; idx text;
+    BEGIN
+        FOREACH col IN ARRAY ARRAY['{"', '".join(CVE_TYPED_COLUMNS)}'] LOOP
+            IF EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = 'cves'
+                AND column_name = col AND data_type IN ('character varying', 'text')
+            ) THEN
+                EXECUTE format('ALTER TABLE cves RENAME COLUMN %I TO %I', col, col || '_legacy');
+            END IF;
+        END LOOP;
+        FOR idx IN
+            SELECT DISTINCT i.indexrelid::regclass::text FROM pg_index i
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+            WHERE i.indrelid = 'cves'::regclass AND a.attname LIKE '%\\_legacy'
+        LOOP
+            EXECUTE 'DROP INDEX ' || idx;
+        END LOOP;
+    END $$""",
+    *(
+        f'ALTER TABLE cves ADD COLUMN IF NOT EXISTS "{name}" {sql_type}'
+        for name, sql_type in CVE_TYPED_COLUMNS.items()
+    ),
+    "CREATE INDEX IF NOT EXISTS ix_cves_cwe_id ON cves (cwe_id)",
+    "CREATE INDEX IF NOT EXISTS ix_cves_attack_vector ON cves (attack_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_cve_cpe_matches_vendor_cve ON cve_cpe_matches (vendor, cve_id)",
+    "CREATE INDEX IF NOT EXISTS ix_cves_published_id ON cves (published_date DESC NULLS LAST, id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_cves_severity_published_id "
+    "ON cves (cvss_v3_severity, published_date DESC NULLS LAST, id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_cves_unanalyzed_published_id "
+    "ON cves (published_date DESC NULLS LAST, id DESC) WHERE is_analyzed = false",
+    "ALTER TABLE cves ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS ({CVE_SEARCH_VECTOR_SQL}) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_cves_search_vector ON cves USING gin (search_vector)",
+    "ALTER TABLE vulnerability_alerts ADD COLUMN IF NOT EXISTS watchlist_entry_id INTEGER",
+    "ALTER TABLE vulnerability_alerts ADD COLUMN IF NOT EXISTS vendor VARCHAR",
+    "CREATE INDEX IF NOT EXISTS ix_vulnerability_alerts_watchlist_entry_id "
+    "ON vulnerability_alerts (watchlist_entry_id)",
+    "ALTER TABLE vulnerability_alerts ADD COLUMN IF NOT EXISTS severity VARCHAR",
+    "ALTER TABLE vulnerability_alerts ADD COLUMN IF NOT EXISTS cvss_v3_score FLOAT",
+    "ALTER TABLE vulnerability_alerts ADD COLUMN IF NOT EXISTS dedup_key VARCHAR",
+    "CREATE UNIQUE INDEX IF NOT EXISTS vulnerability_alerts_dedup_key_key ON vulnerability_alerts (dedup_key)",
+    "CREATE INDEX IF NOT EXISTS ix_vulnerability_alerts_created_id "
+    "ON vulnerability_alerts (created_at DESC, id DESC)",
+    "ALTER TABLE soc2_reports ADD COLUMN IF NOT EXISTS vendor_domain VARCHAR",
+    "CREATE INDEX IF NOT EXISTS ix_soc2_reports_vendor_domain ON soc2_reports (vendor_domain)",
+]
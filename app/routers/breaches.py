@@ -1,91 +1,161 @@
 # app/routers/breaches.py
 
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..database import get_db
-from ..services.breach_service import fetch_all_hibp_breaches
+from ..database import get_async_db, get_db
+from ..services.breach_service import SYNC_SOURCE
+from ..services.breach_snapshot import breach_json, get_snapshot
+from ..services.sync_runner import enqueue_sync_job
+from ..services.domain_utils import registrable_domain
 from .. import crud, schemas
 
 router = APIRouter()
 
+def _json(content: bytes) -> Response:
+    return Response(content=content, media_type="application/json")
+
 @router.post("/sync-breaches", response_model=dict)
 # @router.post("/breaches/sync-breaches", response_model=dict)
-def sync_breaches(db: Session = Depends(get_db)):
-    try:
-        count = fetch_all_hibp_breaches(db)
-        return {"status": "success", "message": f"Synced {count} breaches", "count": count}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error syncing breaches: {e}")
+def sync_breaches(
+    force: bool = Query(False, description="Ignore the stored ETag/Last-Modified and re-download"),
+    db: Session = Depends(get_db)
+):
+    """Queue an HIBP sync for the sync worker; follow it at /sync-jobs/{job_id}."""
+    job = enqueue_sync_job(db, SYNC_SOURCE, {"force": force})
+    if job is None:
+        raise HTTPException(status_code=409, detail="A breach sync is already queued or running")
+    return {
+        "status": "sync_scheduled",
+        "job_id": job.id,
+        "message": "Breach sync has been scheduled",
+    }
+
+def _search_params(
+    query: str = Query(..., min_length=2),
+    mode: str = Query("auto", description="auto, fulltext, fuzzy or substring"),
+    data_classes: list[str] | None = Query(None, description="Only breaches exposing these data classes, e.g. Passwords"),
+    data_class_match: str = Query("any", description="any or all"),
+) -> dict:
+    if mode not in crud.BREACH_SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(crud.BREACH_SEARCH_MODES)}")
+    if data_class_match not in ("any", "all"):
+        raise HTTPException(status_code=400, detail="data_class_match must be 'any' or 'all'")
+    return {
+        "query": query,
+        "mode": mode,
+        "data_classes": data_classes or [],
+        "match_all": data_class_match == "all",
+    }
+
+def _resolve_data_classes(snapshot, params: dict) -> list[int] | None:
+    """Map class names to ids; None means the filter can never match."""
+    names = params["data_classes"]
+    ids = [snapshot.data_classes[n] for n in names if n in snapshot.data_classes]
+    if names and (not ids or (params["match_all"] and len(ids) < len(names))):
+        return None
+    return ids
 
 @router.get("/search", response_model=list[schemas.BreachResponse])
 # @router.get("/breaches/search", response_model=list[schemas.BreachResponse])
-def search_breaches(
-    query: str = Query(..., min_length=2),
+async def search_breaches(
+    params: dict = Depends(_search_params),
     limit: int = Query(50, ge=1),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    results = crud.search_breaches(db, query, limit)
-    return [
-        schemas.BreachResponse(
-            id=b.id,
-            name=b.name,
-            title=b.title or b.name,
-            domain=b.domain,
-            breach_date=str(b.breach_date) if b.breach_date else None,
-            added_date=str(b.added_date) if b.added_date else None,
-            pwn_count=b.pwn_count,
-            description=b.description or "",
-            data_classes=b.data_classes or "",
-            is_verified=b.is_verified,
-            is_fabricated=b.is_fabricated,
+    snapshot = await get_snapshot(db)
+    class_ids = _resolve_data_classes(snapshot, params)
+    if class_ids is None:
+        return _json(b"[]")
+    ids = snapshot.search(
+        params["query"], limit, params["mode"], snapshot.class_mask(class_ids), params["match_all"]
+    )
+    if ids is None:
+        # websearch full-text and trigram matching run in Postgres (GIN indexes)
+        ids = await db.run_sync(
+            crud.search_breach_ids, params["query"], limit, params["mode"], class_ids, params["match_all"]
         )
-        for b in results
-    ]
+        missing = snapshot.missing(ids)
+        if missing:
+            # matched rows newer than this worker's snapshot are read from the table
+            extra = breach_json(await db.run_sync(crud.get_breaches_by_ids, missing))
+            return _json(snapshot.render(ids, extra))
+    return _json(snapshot.render(ids))
+
+@router.get("/search/facets", response_model=dict[str, int])
+async def search_facets(
+    params: dict = Depends(_search_params),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Per-data-class counts of the breaches /search would match (ignoring limit)."""
+    snapshot = await get_snapshot(db)
+    class_ids = _resolve_data_classes(snapshot, params)
+    if class_ids is None:
+        return {}
+    counts = snapshot.facets(
+        params["query"], params["mode"], snapshot.class_mask(class_ids), params["match_all"]
+    )
+    if counts is None:
+        counts = await db.run_sync(
+            crud.get_data_class_facets, params["query"], params["mode"], class_ids, params["match_all"]
+        )
+    return counts
 
 @router.get("/stats", response_model=schemas.BreachStats)
 # @router.get("/breaches/stats", response_model=schemas.BreachStats)
-def get_breach_stats(db: Session = Depends(get_db)):
-    data = crud.get_breach_stats(db)
-    return schemas.BreachStats(**data)
+async def get_breach_stats(db: AsyncSession = Depends(get_async_db)):
+    return _json((await get_snapshot(db)).stats_json)
+
+@router.post("/lookup", response_class=StreamingResponse)
+async def lookup_domains(request: schemas.BreachLookupRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Breach exposure for many vendor domains at once, resolved with a single
+    query on registrable_domain and streamed back as NDJSON in input order.
+    """
+    normalized = [(d, registrable_domain(d)) for d in request.domains]
+    exposure = await db.run_sync(crud.get_domain_exposure, sorted({r for _, r in normalized if r}))
+
+    def lines():
+        for domain, registrable in normalized:
+            summary = schemas.BreachExposureSummary(
+                domain=domain,
+                registrable_domain=registrable,
+                **exposure.get(registrable, {}),
+            )
+            yield summary.model_dump_json().encode() + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.get("/changes", response_model=list[schemas.BreachChangeResponse])
+async def get_breach_changes(
+    since_id: int = Query(0, ge=0, description="Return changes with an id greater than this cursor"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    changes = await db.run_sync(crud.get_breach_changes, since_id, limit)
+    return [
+        schemas.BreachChangeResponse(
+            id=c.id,
+            breach_name=c.breach_name,
+            change_type=c.change_type,
+            content_hash=c.content_hash,
+            changed_at=c.changed_at,
+        )
+        for c in changes
+    ]
 
 @router.get("/{breach_id}", response_model=schemas.BreachResponse)
 # @router.get("/breaches/{breach_id}", response_model=schemas.BreachResponse)
-def get_breach_detail(breach_id: int, db: Session = Depends(get_db)):
-    breach = crud.get_breach_by_id(db, breach_id)
-    if not breach:
+async def get_breach_detail(breach_id: int, db: AsyncSession = Depends(get_async_db)):
+    body = (await get_snapshot(db)).get(breach_id)
+    if body is None:
         raise HTTPException(status_code=404, detail="Breach not found")
-    return schemas.BreachResponse(
-        id=breach.id,
-        name=breach.name,
-        title=breach.title or breach.name,
-        domain=breach.domain,
-        breach_date=str(breach.breach_date) if breach.breach_date else None,
-        added_date=str(breach.added_date) if breach.added_date else None,
-        pwn_count=breach.pwn_count,
-        description=breach.description or "",
-        data_classes=breach.data_classes or "",
-        is_verified=breach.is_verified,
-        is_fabricated=breach.is_fabricated,
-    )
+    return _json(body)
 
 @router.get("/domain/{domain}", response_model=list[schemas.BreachResponse])
 # @router.get("/breaches/domain/{domain}", response_model=list[schemas.BreachResponse])
-def search_by_domain(domain: str, db: Session = Depends(get_db)):
-    breaches = crud.get_breaches_by_domain(db, domain)
-    return [
-        schemas.BreachResponse(
-            id=b.id,
-            name=b.name,
-            title=b.title or b.name,
-            domain=b.domain,
-            breach_date=str(b.breach_date) if b.breach_date else None,
-            added_date=str(b.added_date) if b.added_date else None,
-            pwn_count=b.pwn_count,
-            description=b.description or "",
-            data_classes=b.data_classes or "",
-            is_verified=b.is_verified,
-            is_fabricated=b.is_fabricated,
-        )
-        for b in breaches
-    ]
+async def search_by_domain(domain: str, db: AsyncSession = Depends(get_async_db)):
+    snapshot = await get_snapshot(db)
+    return _json(snapshot.render(snapshot.by_domain(domain)))
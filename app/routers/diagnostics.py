@@ -0,0 +1,17 @@
+# app/routers/diagnostics.py
+
+from fastapi import APIRouter
+
+from ..services import instrumentation
+
+router = APIRouter()
+
+@router.get("/timings", response_model=dict)
+def get_timings():
+    """Event-loop lag and per-route latency histograms (INSTRUMENTATION_ENABLED only)."""
+    return instrumentation.get_timings()
+
+@router.delete("/timings", status_code=204)
+def reset_timings():
+    """Start new per-route histograms, e.g. before a load test."""
+    instrumentation.route_timings.reset()
@@ -5,9 +5,10 @@ import tempfile
 import shutil
 
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..database import get_async_db, get_db
 from ..services.soc2_extractor import SOC2Extractor
 from .. import crud, schemas
 
@@ -46,8 +47,8 @@ def upload_file(file: UploadFile = File(...), db: Session = Depends(get_db)):
         shutil.rmtree(temp_dir)
 
 @router.get("/", response_model=list[schemas.ReportResponse])
-def list_reports(db: Session = Depends(get_db)):
-    reports = crud.get_all_reports(db)
+async def list_reports(db: AsyncSession = Depends(get_async_db)):
+    reports = await db.run_sync(crud.get_all_reports)
     return [
         {
             "id": r.id,
@@ -60,8 +61,8 @@ def list_reports(db: Session = Depends(get_db)):
     ]
 
 @router.get("/{report_id}", response_model=schemas.ReportResponse)
-def get_report(report_id: int, db: Session = Depends(get_db)):
-    report = crud.get_report_by_id(db, report_id)
+async def get_report(report_id: int, db: AsyncSession = Depends(get_async_db)):
+    report = await db.run_sync(crud.get_report_by_id, report_id)
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
     return {
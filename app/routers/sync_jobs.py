@@ -0,0 +1,48 @@
+# app/routers/sync_jobs.py
+
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..models import SyncJob
+from .. import crud, schemas
+
+router = APIRouter()
+
+def _to_response(job: SyncJob) -> schemas.SyncJobResponse:
+    duration = None
+    if job.started_at and job.finished_at:
+        duration = (job.finished_at - job.started_at).total_seconds()
+    return schemas.SyncJobResponse(
+        id=job.id,
+        source=job.source,
+        status=job.status,
+        trigger=job.trigger,
+        params=job.params or {},
+        result=job.result,
+        error=job.error,
+        worker=job.worker,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        duration_seconds=duration,
+    )
+
+@router.get("/", response_model=list[schemas.SyncJobResponse])
+def list_sync_jobs(
+    source: Optional[str] = Query(None, description="'nvd', 'hibp' or 'nvd-feeds'"),
+    status: Optional[str] = Query(None, description="queued, running, succeeded or failed"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """Most recent sync jobs first."""
+    return [_to_response(j) for j in crud.get_sync_jobs(db, source, status, limit)]
+
+@router.get("/{job_id}", response_model=schemas.SyncJobResponse)
+def get_sync_job(job_id: int, db: Session = Depends(get_db)):
+    job = db.get(SyncJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    return _to_response(job)
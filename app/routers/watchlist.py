@@ -0,0 +1,64 @@
+# app/routers/watchlist.py
+
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from .. import crud, schemas
+
+router = APIRouter()
+
+def _to_response(entry) -> schemas.WatchlistEntryResponse:
+    return schemas.WatchlistEntryResponse(
+        id=entry.id,
+        name=entry.name,
+        vendor=entry.vendor,
+        product=entry.product,
+        keywords=entry.keywords or [],
+        min_cvss_score=entry.min_cvss_score,
+        source=entry.source,
+        vendor_domain=entry.vendor_domain,
+        is_active=entry.is_active,
+        created_at=entry.created_at,
+    )
+
+def _check_match_target(fields: dict):
+    """Reject (normalized) entries the watchlist matcher could never act on."""
+    if not (fields.get("vendor") or fields.get("keywords")):
+        raise HTTPException(status_code=400, detail="An entry needs a CPE vendor or at least one keyword")
+    if fields.get("product") and not fields.get("vendor"):
+        raise HTTPException(status_code=422, detail="A CPE product is only matched together with its vendor")
+
+@router.get("/", response_model=list[schemas.WatchlistEntryResponse])
+def list_watchlist(db: Session = Depends(get_db)):
+    return [_to_response(e) for e in crud.get_watchlist(db)]
+
+@router.post("/", response_model=schemas.WatchlistEntryResponse)
+def add_watchlist_entry(entry: schemas.WatchlistEntryCreate, db: Session = Depends(get_db)):
+    _check_match_target(crud.normalize_watchlist_fields(entry.model_dump()))
+    return _to_response(crud.create_watchlist_entry(db, entry.model_dump()))
+
+@router.post("/sync-reports", response_model=dict)
+def sync_watchlist_from_reports(db: Session = Depends(get_db)):
+    """Add entries for vendors of stored SOC 2 reports that are not watched yet."""
+    created = crud.sync_report_watchlist(db)
+    db.commit()
+    return {"status": "success", "created": created}
+
+@router.patch("/{entry_id}", response_model=schemas.WatchlistEntryResponse)
+def update_watchlist_entry(entry_id: int, changes: schemas.WatchlistEntryUpdate, db: Session = Depends(get_db)):
+    entry = crud.get_watchlist_entry(db, entry_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Watchlist entry not found")
+    fields = changes.model_dump(exclude_unset=True)
+    current = {"vendor": entry.vendor, "product": entry.product, "keywords": entry.keywords}
+    _check_match_target({**current, **crud.normalize_watchlist_fields(dict(fields))})
+    return _to_response(crud.update_watchlist_entry(db, entry, fields))
+
+@router.delete("/{entry_id}", response_model=dict)
+def remove_watchlist_entry(entry_id: int, db: Session = Depends(get_db)):
+    entry = crud.get_watchlist_entry(db, entry_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Watchlist entry not found")
+    crud.delete_watchlist_entry(db, entry)
+    return {"status": "success"}
@@ -1,9 +1,11 @@
 # app/schemas.py
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator, model_validator
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 
+from .services.watchlist_matcher import MIN_KEYWORD_LENGTH
+
 # ——— SOC2 Models ———
 class ScoreBreakdown(BaseModel):
     trust_criteria: float
@@ -50,10 +52,46 @@ class BreachResponse(BaseModel):
     is_verified: bool
     is_fabricated: bool
 
+class BreachChangeResponse(BaseModel):
+    id: int
+    breach_name: str
+    change_type: str
+    content_hash: Optional[str]
+    changed_at: datetime
+
+class BreachLookupRequest(BaseModel):
+    domains: List[str] = Field(..., min_length=1, max_length=10000)
+
+class BreachExposureSummary(BaseModel):
+    domain: str
+    registrable_domain: Optional[str]
+    breach_count: int = 0
+    total_pwned: int = 0
+    latest_breach_date: Optional[str] = None
+    data_classes: List[str] = []
+
+class BreachYearCount(BaseModel):
+    year: int
+    breaches: int
+    pwned_accounts: int
+
+class BreachDomainCount(BaseModel):
+    domain: str
+    breaches: int
+    pwned_accounts: int
+
 class BreachStats(BaseModel):
     total_breaches: int
     total_pwned_accounts: int
     last_updated: str
+    verified_count: int = 0
+    sensitive_count: int = 0
+    fabricated_count: int = 0
+    spam_list_count: int = 0
+    retired_count: int = 0
+    by_year: List[BreachYearCount] = []
+    by_data_class: Dict[str, int] = {}
+    top_domains: List[BreachDomainCount] = []
 
 # ——— CVE/Vulnerability Models ———
 class CVEResponse(BaseModel):
@@ -70,6 +108,13 @@ class CVEResponse(BaseModel):
     is_analyzed: bool
     created_at: datetime
 
+class CVEBatchRequest(BaseModel):
+    cve_ids: List[str] = Field(..., min_length=1, max_length=5000)
+
+class CVESearchResult(CVEResponse):
+    rank: float
+    highlight: str  # description fragments with matches wrapped in <mark></mark>
+
 class CVEDetailResponse(BaseModel):
     id: int
     cve_id: str
@@ -81,9 +126,9 @@ class CVEDetailResponse(BaseModel):
     cvss_v2_score: Optional[float]
     vendor_project: Optional[str]
     product: Optional[str]
-    version_affected: Optional[str]
+    version_affected: Optional[List[str]]
     cwe_id: Optional[str]
-    references: Optional[str]
+    references: Optional[List[str]]
     attack_vector: Optional[str]
     attack_complexity: Optional[str]
     privileges_required: Optional[str]
@@ -95,6 +140,14 @@ class CVEDetailResponse(BaseModel):
     is_analyzed: bool
     created_at: datetime
 
+class VulnerabilityStatsGroup(BaseModel):
+    key: str
+    total: int
+    critical_count: int
+    high_count: int
+    medium_count: int
+    low_count: int
+
 class VulnerabilityStats(BaseModel):
     total_cves: int
     critical_count: int
@@ -104,6 +157,28 @@ class VulnerabilityStats(BaseModel):
     recent_7_days: int
     unanalyzed_count: int
     last_updated: str
+    group_by: Optional[str] = None
+    groups: Optional[List[VulnerabilityStatsGroup]] = None
+
+class InventoryItem(BaseModel):
+    vendor: Optional[str] = None
+    product: str
+    version: Optional[str] = None  # omitted = every version
+
+class InventoryRequest(BaseModel):
+    items: List[InventoryItem] = Field(..., min_length=1, max_length=5000)
+
+class AffectingCVE(BaseModel):
+    cve_id: str
+    cvss_v3_score: Optional[float]
+    cvss_v3_severity: Optional[str]
+    criteria: str
+
+class AffectedInventoryItem(BaseModel):
+    vendor: Optional[str]
+    product: str
+    version: Optional[str]
+    cves: List[AffectingCVE]
 
 class AlertResponse(BaseModel):
     id: int
@@ -112,3 +187,83 @@ class AlertResponse(BaseModel):
     message: str
     is_read: bool
     created_at: datetime
+    vendor: Optional[str] = None
+    watchlist_entry_id: Optional[int] = None
+    severity: Optional[str] = None
+    cvss_v3_score: Optional[float] = None
+
+class AlertDigestResponse(BaseModel):
+    id: int
+    watchlist_entry_id: int
+    vendor: Optional[str]
+    severity: str
+    window_start: datetime
+    window_minutes: int
+    alert_count: int
+    max_cvss_score: Optional[float]
+    cve_ids: List[str]
+    is_read: bool
+    updated_at: datetime
+
+class SyncJobResponse(BaseModel):
+    id: int
+    source: str
+    status: str
+    trigger: str
+    params: Dict[str, Any]
+    result: Optional[Dict[str, Any]]
+    error: Optional[str]
+    worker: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    duration_seconds: Optional[float]
+
+def _check_keywords(keywords: Optional[List[str]]) -> Optional[List[str]]:
+    # the matcher ignores shorter keywords, so accepting them would be a silent no-op
+    short = [k for k in keywords or [] if 0 < len(k.strip()) < MIN_KEYWORD_LENGTH]
+    if short:
+        raise ValueError(f"keywords must be at least {MIN_KEYWORD_LENGTH} characters: {', '.join(short)}")
+    return keywords
+
+class WatchlistEntryCreate(BaseModel):
+    name: str = Field(..., min_length=1)
+    vendor: Optional[str] = None
+    product: Optional[str] = None
+    keywords: List[str] = []
+    min_cvss_score: float = Field(7.0, ge=0, le=10)
+
+    _keywords = field_validator("keywords")(_check_keywords)
+
+class WatchlistEntryUpdate(BaseModel):
+    # Partial update (applied with exclude_unset): vendor, product and keywords
+    # may be cleared with null, the NOT NULL columns may only be omitted.
+    name: Optional[str] = Field(None, min_length=1)
+    vendor: Optional[str] = None
+    product: Optional[str] = None
+    keywords: Optional[List[str]] = None
+    min_cvss_score: Optional[float] = Field(None, ge=0, le=10)
+    is_active: Optional[bool] = None
+
+    _keywords = field_validator("keywords")(_check_keywords)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _reject_null_required(cls, data):
+        if isinstance(data, dict):
+            nulls = [k for k in ("name", "min_cvss_score", "is_active") if k in data and data[k] is None]
+            if nulls:
+                raise ValueError(f"{', '.join(nulls)} cannot be null")
+        return data
+
+class WatchlistEntryResponse(BaseModel):
+    id: int
+    name: str
+    vendor: Optional[str]
+    product: Optional[str]
+    keywords: List[str]
+    min_cvss_score: float
+    source: str
+    vendor_domain: Optional[str]
+    is_active: bool
+    created_at: datetime
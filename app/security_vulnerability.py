@@ -3,22 +3,155 @@
 import os
 import time
 import json
+import base64
+import threading
 import logging
 import requests
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
 
-from fastapi import HTTPException, Depends, Query, BackgroundTasks
+from fastapi import HTTPException, Depends, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import Integer, String, Text, and_, cast, column, desc, func, or_, select, text, tuple_, values
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 
-from .database import Base, SessionLocal, get_db
-from .models import CVE, VulnerabilityAlert
-from .schemas import CVEResponse, CVEDetailResponse, VulnerabilityStats, AlertResponse
+from . import crud
+from .database import AsyncSessionLocal, Base, engine, get_async_db, get_db
+from .models import AlertDigest, CVE, CpeMatch, NVDFeedImport, RateLimitBucket, VulnerabilityAlert
+from core.config import NVD_FEED_DIR
+from .schemas import (
+    CVEBatchRequest, CVEResponse, CVEDetailResponse, CVESearchResult,
+    VulnerabilityStats, VulnerabilityStatsGroup, AlertDigestResponse, AlertResponse,
+    InventoryRequest, AffectedInventoryItem, AffectingCVE,
+)
+from .services.cpe_matching import cpe_name_part, parse_cpe_matches, version_sort_key
+from .services.alert_pipeline import store_alerts
+from .services.alert_stream import broadcaster
+from .services.sync_runner import enqueue_sync_job
+from .services.watchlist_matcher import WatchlistMatcher
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# ----------------------
+# Rate limiting
+# ----------------------
+# NVD allows 5 requests per rolling 30 s window without an API key, 50 with one
+NVD_RATE_WINDOW_SECONDS = 30
+NVD_REQUESTS_PER_WINDOW = 5
+NVD_REQUESTS_PER_WINDOW_WITH_KEY = 50
+# NVD rejects pub*/lastMod* date ranges longer than this
+NVD_MAX_RANGE_DAYS = 120
+NVD_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.000"
+# Query parameter prefixes for the two date filters NVD supports
+NVD_DATE_FIELDS = {"published": "pub", "modified": "lastMod"}
+NVD_SYNC_SOURCE = "nvd"
+# Incremental windows start this far before the watermark to absorb NVD indexing lag
+NVD_WATERMARK_OVERLAP = timedelta(minutes=15)
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Built with for_rolling_window(), burst plus
+    refill over one window never exceeds the window's request limit.
+    """
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_rolling_window(cls, limit: int, window_seconds: float, burst: Optional[int] = None) -> "TokenBucket":
+        burst = burst if burst is not None else max(1, limit // 5)
+        return cls(capacity=burst, refill_per_second=(limit - burst) / window_seconds)
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def acquire(self) -> float:
+        """Block until a token is available; returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                sleep_time = (1 - self.tokens) / self.refill_per_second
+            logger.info(f"Rate limiting: sleeping for {sleep_time:.1f} seconds")
+            time.sleep(sleep_time)
+            waited += sleep_time
+
+class SharedTokenBucket(TokenBucket):
+    """
+    TokenBucket whose state is a rate_limit_buckets row, so every worker
+    process and host draws from one budget. Each take is a single upsert
+    under the row lock, refilled from the database clock. A take always
+    reserves a token: when the bucket is short its balance goes negative and
+    the caller sleeps until its token has refilled, so waiting workers queue
+    up instead of polling.
+    """
+    _TAKE_SQL = text("""
+        INSERT INTO rate_limit_buckets AS r (name, tokens, updated_at)
+        VALUES (:name, :capacity - 1, clock_timestamp())
+        ON CONFLICT (name) DO UPDATE
+        SET tokens = least(:capacity, r.tokens + :rate * extract(epoch FROM clock_timestamp() - r.updated_at)) - 1,
+            updated_at = clock_timestamp()
+        RETURNING r.tokens + 1
+    """)
+
+    def __init__(self, name: str, capacity: float, refill_per_second: float):
+        super().__init__(capacity, refill_per_second)
+        self.name = name
+
+    @classmethod
+    def for_rolling_window(
+        cls, name: str, limit: int, window_seconds: float, burst: Optional[int] = None
+    ) -> "SharedTokenBucket":
+        local = TokenBucket.for_rolling_window(limit, window_seconds, burst)
+        return cls(name, local.capacity, local.refill_per_second)
+
+    def _params(self) -> dict:
+        return {"name": self.name, "capacity": self.capacity, "rate": self.refill_per_second}
+
+    def _take(self) -> float:
+        """Reserve a token (creating the bucket full); returns the tokens that were available."""
+        with engine.begin() as conn:
+            return conn.execute(self._TAKE_SQL, self._params()).scalar()
+
+    def acquire(self) -> float:
+        available = self._take()
+        if available >= 1:
+            return 0.0
+        sleep_time = (1 - available) / self.refill_per_second
+        logger.info(f"Rate limiting ({self.name}): sleeping for {sleep_time:.1f} seconds")
+        time.sleep(sleep_time)
+        return sleep_time
+
+    def drain(self):
+        """Empty the bucket for every worker, e.g. after NVD answered 403; reservations stay owed."""
+        with engine.begin() as conn:
+            conn.execute(
+                RateLimitBucket.__table__.update()
+                .where(RateLimitBucket.name == self.name)
+                .values(tokens=func.least(RateLimitBucket.tokens, 0), updated_at=func.clock_timestamp())
+            )
+
+def split_date_range(start: datetime, end: datetime, max_days: int = NVD_MAX_RANGE_DAYS) -> List[tuple]:
+    """Split [start, end] into consecutive windows no longer than max_days."""
+    windows = []
+    step = timedelta(days=max_days)
+    while start < end:
+        window_end = min(start + step, end)
+        windows.append((start, window_end))
+        start = window_end
+    return windows
+
 # ----------------------
 # NVD Client
 # ----------------------
@@ -26,52 +159,260 @@ class NVDClient:
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key
         self.base_url = "https://services.nvd.nist.gov/rest/json/cves/2.0"
-        # 6.5 seconds per request if no API key, else 0.6 seconds
-        self.rate_limit_delay = 0.6 if api_key else 6.5
-        self.last_request_time = 0
-        
+        self.page_size = 2000 if api_key else 100
+        # one budget per limit tier, shared by all workers through the database
+        self.rate_limiter = SharedTokenBucket.for_rolling_window(
+            "nvd:key" if api_key else "nvd:public",
+            NVD_REQUESTS_PER_WINDOW_WITH_KEY if api_key else NVD_REQUESTS_PER_WINDOW,
+            NVD_RATE_WINDOW_SECONDS,
+        )
+
     def _respect_rate_limit(self):
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        if time_since_last_request < self.rate_limit_delay:
-            sleep_time = self.rate_limit_delay - time_since_last_request
-            logger.info(f"Rate limiting: sleeping for {sleep_time:.1f} seconds")
-            time.sleep(sleep_time)
-        
-        self.last_request_time = time.time()
-        
-    def fetch_cves(self, days: int = 1, results_per_page: int = 100) -> dict:
+        self.rate_limiter.acquire()
+
+    def fetch_cves_page(
+        self, start: datetime, end: datetime, start_index: int = 0, date_field: str = "published"
+    ) -> dict:
+        """
+        Fetch one page of CVEs published (or, with date_field="modified", last
+        modified) in [start, end], which must be at most NVD_MAX_RANGE_DAYS apart.
+        """
         try:
-            since = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%S.000")
-            end_date = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.000")
-            
+            prefix = NVD_DATE_FIELDS[date_field]
             params = {
-                "resultsPerPage": min(results_per_page, 2000 if self.api_key else 100),
-                "pubStartDate": since,
-                "pubEndDate": end_date
+                "resultsPerPage": self.page_size,
+                "startIndex": start_index,
+                f"{prefix}StartDate": start.strftime(NVD_DATE_FORMAT),
+                f"{prefix}EndDate": end.strftime(NVD_DATE_FORMAT),
             }
-            
+
             headers = {"User-Agent": "SOC-CVE-Monitor/1.0"}
             if self.api_key:
                 headers["apiKey"] = self.api_key
-                
-            logger.info(f"Fetching CVEs published since {since}")
+
+            logger.info(
+                f"Fetching CVEs {date_field} {params[f'{prefix}StartDate']} - {params[f'{prefix}EndDate']} "
+                f"from index {start_index}"
+            )
             self._respect_rate_limit()
-            
+
             response = requests.get(self.base_url, params=params, headers=headers, timeout=30)
-            
+
             if response.status_code == 403:
                 logger.error("Rate limit exceeded")
+                self.rate_limiter.drain()
                 raise HTTPException(status_code=429, detail="Rate limit exceeded")
-                
+
             response.raise_for_status()
             return response.json()
-            
+
         except requests.RequestException as e:
             logger.error(f"Error fetching CVEs from NVD: {e}")
             raise HTTPException(status_code=500, detail=f"NVD API error: {e}")
 
+    def iter_cve_pages(self, start: datetime, end: datetime, date_field: str = "published"):
+        """
+        Yield every page for [start, end], splitting the range into NVD-sized
+        windows and following totalResults/startIndex. The next page is
+        requested on a background thread while the caller processes the
+        current one.
+        """
+        requests_ahead = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nvd-prefetch")
+        try:
+            for window_start, window_end in split_date_range(start, end):
+                start_index = 0
+                pending = requests_ahead.submit(
+                    self.fetch_cves_page, window_start, window_end, start_index, date_field
+                )
+                while pending is not None:
+                    page = pending.result()
+                    total = page.get("totalResults", 0)
+                    received = len(page.get("vulnerabilities", []))
+                    start_index += received
+                    pending = None
+                    if received and start_index < total:
+                        pending = requests_ahead.submit(
+                            self.fetch_cves_page, window_start, window_end, start_index, date_field
+                        )
+                    yield page
+        finally:
+            requests_ahead.shutdown(wait=True, cancel_futures=True)
+
+    def fetch_cves(self, days: int = 1) -> dict:
+        """Fetch all CVEs published in the last `days` days as one NVD-shaped response."""
+        end = datetime.utcnow()
+        vulnerabilities = []
+        for page in self.iter_cve_pages(end - timedelta(days=days), end):
+            vulnerabilities.extend(page.get("vulnerabilities", []))
+        return {"totalResults": len(vulnerabilities), "vulnerabilities": vulnerabilities}
+
+# ----------------------
+# Bulk CVE writes
+# ----------------------
+CVE_UPSERT_BATCH_SIZE = 1000
+# Columns written by sync_cves, i.e. the keys parse_cve_data produces
+CVE_SYNC_COLUMNS = (
+    "cve_id", "description", "published_date", "last_modified",
+    "cvss_v3_score", "cvss_v3_severity", "cvss_v2_score", "cwe_id", "references",
+    "vendor_project", "product", "version_affected",
+    "attack_vector", "attack_complexity", "privileges_required", "user_interaction",
+    "scope", "confidentiality_impact", "integrity_impact", "availability_impact",
+)
+
+def _parse_nvd_timestamp(value: str) -> Optional[datetime]:
+    """NVD timestamps are UTC; store them naive to match the DateTime columns."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def cve_upsert(rows: List[dict]):
+    """INSERT ... ON CONFLICT (cve_id) DO UPDATE, skipping rows whose last_modified is unchanged."""
+    cves = CVE.__table__
+    upsert = pg_insert(cves).values(rows)
+    return upsert.on_conflict_do_update(
+        index_elements=[cves.c.cve_id],
+        set_={col: upsert.excluded[col] for col in CVE_SYNC_COLUMNS if col != "cve_id"},
+        where=cves.c.last_modified.is_distinct_from(upsert.excluded.last_modified),
+    )
+
+def replace_cpe_matches(db: Session, matches_by_cve: Dict[str, List[dict]]):
+    """Swap the cve_cpe_matches rows of the given CVEs for freshly parsed ones."""
+    if not matches_by_cve:
+        return
+    db.execute(
+        CpeMatch.__table__.delete().where(
+            CpeMatch.cve_id == func.any(cast(list(matches_by_cve), ARRAY(String)))
+        )
+    )
+    rows = [m for matches in matches_by_cve.values() for m in matches]
+    for start in range(0, len(rows), CVE_UPSERT_BATCH_SIZE):
+        db.execute(CpeMatch.__table__.insert(), rows[start:start + CVE_UPSERT_BATCH_SIZE])
+
+def watchlist_alerts(matcher, rows: List[dict], cpe_matches: Dict[str, List[dict]], previous_scores: Dict[str, Optional[float]]) -> List[dict]:
+    """
+    Evaluate the compiled watchlist over a batch of upserted CVE rows. A
+    matched entry alerts when the CVE is new and meets the entry's
+    min_cvss_score, or when an update lifts the score across it.
+    """
+    alerts = []
+    now = datetime.utcnow()
+    for row in rows:
+        score = row.get("cvss_v3_score")
+        if score is None:
+            continue
+        cve_id = row["cve_id"]
+        pairs = {(m["vendor"], m["product"]) for m in cpe_matches.get(cve_id, ())}
+        for entry_id, how in matcher.match(sorted(pairs), row.get("description")).items():
+            entry = matcher.entries[entry_id]
+            if score < entry.min_cvss_score:
+                continue
+            if cve_id in previous_scores and (previous_scores[cve_id] or 0) >= entry.min_cvss_score:
+                continue  # already alerted when it first crossed the threshold
+            via = "affected product" if how == "cpe" else "description mention"
+            alerts.append({
+                "cve_id": cve_id,
+                "alert_type": "watchlist",
+                "message": f"{cve_id} affects watched vendor {entry.name} ({via}, CVSS: {score})",
+                "is_read": False,
+                "created_at": now,
+                "watchlist_entry_id": entry.id,
+                "vendor": entry.name,
+                "severity": row.get("cvss_v3_severity"),
+                "cvss_v3_score": score,
+            })
+    return alerts
+
+# ----------------------
+# CVE parsing
+# ----------------------
+def parse_cve_item(cve_item: dict) -> dict:
+    """Flatten one NVD 2.0 vulnerability item into CVE column values."""
+    cve = cve_item.get("cve", {})
+
+    # Basic info
+    cve_id = cve.get("id", "")
+    descriptions = cve.get("descriptions", [])
+    description = next((d.get("value", "") for d in descriptions if d.get("lang") == "en"), "")
+
+    # Dates
+    published = cve.get("published", "")
+    last_modified = cve.get("lastModified", "")
+
+    # CVSS scores
+    metrics = cve.get("metrics", {})
+    cvss_v3 = metrics.get("cvssMetricV31", [])
+    cvss_v2 = metrics.get("cvssMetricV2", [])
+
+    cvss_v3_score = None
+    cvss_v3_severity = None
+    cvss_details = {}
+
+    if cvss_v3:
+        cvss_data = cvss_v3[0].get("cvssData", {})
+        cvss_v3_score = cvss_data.get("baseScore")
+        cvss_v3_severity = cvss_data.get("baseSeverity")
+        cvss_details = {
+            "attack_vector": cvss_data.get("attackVector"),
+            "attack_complexity": cvss_data.get("attackComplexity"),
+            "privileges_required": cvss_data.get("privilegesRequired"),
+            "user_interaction": cvss_data.get("userInteraction"),
+            "scope": cvss_data.get("scope"),
+            "confidentiality_impact": cvss_data.get("confidentialityImpact"),
+            "integrity_impact": cvss_data.get("integrityImpact"),
+            "availability_impact": cvss_data.get("availabilityImpact")
+        }
+
+    cvss_v2_score = None
+    if cvss_v2:
+        cvss_v2_score = cvss_v2[0].get("cvssData", {}).get("baseScore")
+
+    # CWE
+    weaknesses = cve.get("weaknesses", [])
+    cwe_id = None
+    if weaknesses:
+        cwe_descriptions = weaknesses[0].get("description", [])
+        if cwe_descriptions:
+            cwe_id = cwe_descriptions[0].get("value", "")
+
+    # References
+    references = [ref.get("url", "") for ref in cve.get("references", [])]
+
+    # Affected products
+    configurations = cve.get("configurations", [])
+    affected_products = []
+    vendor_info = set()
+
+    for config in configurations:
+        nodes = config.get("nodes", [])
+        for node in nodes:
+            cpe_matches = node.get("cpeMatch", [])
+            for match in cpe_matches:
+                if match.get("vulnerable", False):
+                    criteria = match.get("criteria", "")
+                    affected_products.append(criteria)
+                    parts = criteria.split(":")
+                    if len(parts) >= 4:
+                        vendor_info.add(f"{parts[3]}:{parts[4]}")
+
+    return {
+        "cve_id": cve_id,
+        "description": description,
+        "published_date": _parse_nvd_timestamp(published),
+        "last_modified": _parse_nvd_timestamp(last_modified),
+        "cvss_v3_score": cvss_v3_score,
+        "cvss_v3_severity": cvss_v3_severity,
+        "cvss_v2_score": cvss_v2_score,
+        "cwe_id": cwe_id,
+        "references": references,
+        "vendor_project": "|".join(vendor_info),
+        "product": "",
+        "version_affected": affected_products,
+        **cvss_details
+    }
+
 # ----------------------
 # Vulnerability Service
 # ----------------------
@@ -84,133 +425,115 @@ class VulnerabilityService:
         else:
             logger.info("No NVD API key - using standard rate limits")
         self.nvd_client = NVDClient(api_key)
+        # compiled on first use, so every page of one sync shares it
+        self.watchlist: Optional[WatchlistMatcher] = None
 
     def parse_cve_data(self, cve_item: dict) -> dict:
-        cve = cve_item.get("cve", {})
-        
-        # Basic info
-        cve_id = cve.get("id", "")
-        descriptions = cve.get("descriptions", [])
-        description = next((d.get("value", "") for d in descriptions if d.get("lang") == "en"), "")
-        
-        # Dates
-        published = cve.get("published", "")
-        last_modified = cve.get("lastModified", "")
-        
-        # CVSS scores
-        metrics = cve.get("metrics", {})
-        cvss_v3 = metrics.get("cvssMetricV31", [])
-        cvss_v2 = metrics.get("cvssMetricV2", [])
-        
-        cvss_v3_score = None
-        cvss_v3_severity = None
-        cvss_details = {}
-        
-        if cvss_v3:
-            cvss_data = cvss_v3[0].get("cvssData", {})
-            cvss_v3_score = cvss_data.get("baseScore")
-            cvss_v3_severity = cvss_data.get("baseSeverity")
-            cvss_details = {
-                "attack_vector": cvss_data.get("attackVector"),
-                "attack_complexity": cvss_data.get("attackComplexity"),
-                "privileges_required": cvss_data.get("privilegesRequired"),
-                "user_interaction": cvss_data.get("userInteraction"),
-                "scope": cvss_data.get("scope"),
-                "confidentiality_impact": cvss_data.get("confidentialityImpact"),
-                "integrity_impact": cvss_data.get("integrityImpact"),
-                "availability_impact": cvss_data.get("availabilityImpact")
-            }
-        
-        cvss_v2_score = None
-        if cvss_v2:
-            cvss_v2_score = cvss_v2[0].get("cvssData", {}).get("baseScore")
-        
-        # CWE
-        weaknesses = cve.get("weaknesses", [])
-        cwe_id = None
-        if weaknesses:
-            cwe_descriptions = weaknesses[0].get("description", [])
-            if cwe_descriptions:
-                cwe_id = cwe_descriptions[0].get("value", "")
-        
-        # References
-        references = [ref.get("url", "") for ref in cve.get("references", [])]
-        
-        # Affected products
-        configurations = cve.get("configurations", [])
-        affected_products = []
-        vendor_info = set()
-        
-        for config in configurations:
-            nodes = config.get("nodes", [])
-            for node in nodes:
-                cpe_matches = node.get("cpeMatch", [])
-                for match in cpe_matches:
-                    if match.get("vulnerable", False):
-                        criteria = match.get("criteria", "")
-                        affected_products.append(criteria)
-                        parts = criteria.split(":")
-                        if len(parts) >= 4:
-                            vendor_info.add(f"{parts[3]}:{parts[4]}")
-        
-        return {
-            "cve_id": cve_id,
-            "description": description,
-            "published_date": datetime.fromisoformat(published.replace("Z", "+00:00")) if published else None,
-            "last_modified": datetime.fromisoformat(last_modified.replace("Z", "+00:00")) if last_modified else None,
-            "cvss_v3_score": cvss_v3_score,
-            "cvss_v3_severity": cvss_v3_severity,
-            "cvss_v2_score": cvss_v2_score,
-            "cwe_id": cwe_id,
-            "references": json.dumps(references),
-            "vendor_project": "|".join(vendor_info),
-            "product": "",
-            "version_affected": json.dumps(affected_products),
-            **cvss_details
+        return parse_cve_item(cve_item)
+
+    def _store_page(self, vulnerabilities: list) -> tuple:
+        """
+        Write one NVD page with a single prefetch query plus one
+        INSERT ... ON CONFLICT (cve_id) statement per batch, then evaluate the
+        vendor watchlist over the changed CVEs and hand their alerts to the
+        de-duplicating alert pipeline. Returns (new, updated) counts.
+        """
+        rows = {}
+        cpe_matches = {}
+        for vuln_item in vulnerabilities:
+            try:
+                cve_data = self.parse_cve_data(vuln_item)
+                matches = parse_cpe_matches(vuln_item)
+            except Exception as e:
+                logger.error(f"Error processing CVE {vuln_item.get('cve', {}).get('id', 'unknown')}: {e}")
+                continue
+            if cve_data["cve_id"]:
+                rows[cve_data["cve_id"]] = {col: cve_data.get(col) for col in CVE_SYNC_COLUMNS}
+                cpe_matches[cve_data["cve_id"]] = matches
+        if not rows:
+            return 0, 0
+
+        known = {
+            cve_id: (last_modified, score)
+            for cve_id, last_modified, score in self.db.query(CVE.cve_id, CVE.last_modified, CVE.cvss_v3_score)
+            .filter(CVE.cve_id == func.any(cast(list(rows), ARRAY(String))))
         }
-    
-    def sync_cves(self, days: int = 1) -> Dict[str, int]:
+        changed = [
+            row for cve_id, row in rows.items()
+            if cve_id not in known or known[cve_id][0] != row["last_modified"]
+        ]
+        new_cves = sum(1 for row in changed if row["cve_id"] not in known)
+
+        for start in range(0, len(changed), CVE_UPSERT_BATCH_SIZE):
+            self.db.execute(cve_upsert(changed[start:start + CVE_UPSERT_BATCH_SIZE]))
+        replace_cpe_matches(self.db, {row["cve_id"]: cpe_matches[row["cve_id"]] for row in changed})
+
+        if self.watchlist is None:
+            self.watchlist = WatchlistMatcher(crud.get_watchlist(self.db, active_only=True))
+        if self.watchlist and changed:
+            previous_scores = {cve_id: score for cve_id, (_, score) in known.items()}
+            alerts = watchlist_alerts(self.watchlist, changed, cpe_matches, previous_scores)
+            store_alerts(self.db, alerts)
+        return new_cves, len(changed) - new_cves
+
+    def sync_cves(self, days: Optional[int] = None, backfill: bool = False) -> Dict[str, Any]:
+        """
+        Incremental by default: fetch CVEs whose lastModified falls between the
+        stored watermark and now, so re-scored and updated CVEs are picked up.
+        Without a watermark the window starts `days` (default 1) ago.
+
+        backfill=True is the cold-start mode: fetch everything published in the
+        last `days` days, then start incremental syncs from now.
+
+        Each page is committed as soon as it is written, while the client
+        prefetches the next one. The watermark only advances in the same
+        transaction as the last page, so a failed sync is retried from the old
+        watermark and no modification is skipped. It only moves to `end` when
+        the modified-date window reached back to it (or none was stored yet);
+        a short `days` window or a backfill by published date leaves it alone.
+        """
         try:
-            data = self.nvd_client.fetch_cves(days=days)
-            vulnerabilities = data.get("vulnerabilities", [])
-            
+            end = datetime.utcnow()
+            state = crud.get_sync_state(self.db, NVD_SYNC_SOURCE)
+            old_watermark = state.watermark if state else None
+            if backfill:
+                start, date_field = end - timedelta(days=days or 1), "published"
+            elif state and state.watermark and not days:
+                start, date_field = state.watermark - NVD_WATERMARK_OVERLAP, "modified"
+            else:
+                start, date_field = end - timedelta(days=days or 1), "modified"
+
             new_cves = 0
             updated_cves = 0
-            
-            for vuln_item in vulnerabilities:
-                try:
-                    cve_data = self.parse_cve_data(vuln_item)
-                    cve_id = cve_data["cve_id"]
-                    if not cve_id:
-                        continue
-                    
-                    existing_cve = self.db.query(CVE).filter_by(cve_id=cve_id).first()
-                    
-                    if existing_cve:
-                        if existing_cve.last_modified != cve_data["last_modified"]:
-                            for key, value in cve_data.items():
-                                if key != "cve_id":
-                                    setattr(existing_cve, key, value)
-                            updated_cves += 1
-                    else:
-                        new_cve = CVE(**cve_data)
-                        self.db.add(new_cve)
-                        new_cves += 1
-                        # Create alerts for critical vulnerabilities
-                        if cve_data.get("cvss_v3_score", 0) >= 9.0:
-                            alert = VulnerabilityAlert(
-                                cve_id=cve_id,
-                                alert_type="critical",
-                                message=f"Critical vulnerability detected: {cve_id} (CVSS: {cve_data['cvss_v3_score']})"
-                            )
-                            self.db.add(alert)
-                except Exception as e:
-                    logger.error(f"Error processing CVE {cve_data.get('cve_id', 'unknown')}: {e}")
-                    continue
-            
+            pages = 0
+
+            for page in self.nvd_client.iter_cve_pages(start, end, date_field):
+                page_new, page_updated = self._store_page(page.get("vulnerabilities", []))
+                self.db.commit()
+                new_cves += page_new
+                updated_cves += page_updated
+                pages += 1
+
+            covers_watermark = old_watermark is None or (date_field == "modified" and start <= old_watermark)
+            watermark = end if covers_watermark else old_watermark
+            crud.save_sync_state(
+                self.db, NVD_SYNC_SOURCE, bump_version=bool(new_cves or updated_cves), watermark=watermark
+            )
             self.db.commit()
-            logger.info(f"CVE sync complete: {new_cves} new, {updated_cves} updated")
-            return {"new_cves": new_cves, "updated_cves": updated_cves}
+            invalidate_stats_cache()
+
+            logger.info(
+                f"CVE sync complete ({date_field} {start:%Y-%m-%d %H:%M} - {end:%Y-%m-%d %H:%M}): "
+                f"{new_cves} new, {updated_cves} updated across {pages} pages"
+            )
+            return {
+                "new_cves": new_cves,
+                "updated_cves": updated_cves,
+                "pages": pages,
+                "mode": "backfill" if backfill else "incremental",
+                "window_start": start.isoformat(),
+                "watermark": watermark.isoformat(),
+            }
         except Exception as e:
             self.db.rollback()
             logger.error(f"Error syncing CVEs: {e}")
@@ -225,42 +548,97 @@ def get_vulnerability_service(db: Session = Depends(get_db)) -> VulnerabilitySer
 # ----------------------
 # API Endpoints for Vulnerabilities
 # ----------------------
-async def sync_vulnerabilities(
-    background_tasks: BackgroundTasks,
-    days: int = Query(1, description="Number of days to fetch CVEs for"),
-    db: Session = Depends(get_db)
+def sync_vulnerabilities(
+    days: Optional[int] = Query(None, description="Window in days; defaults to everything modified since the last sync"),
+    backfill: bool = Query(False, description="Cold start: fetch CVEs published in the last `days` days"),
+    db: Session = Depends(get_db),
 ):
-    """Schedule an asynchronous CVE sync."""
-    def sync_task():
-        service = VulnerabilityService(db)
-        return service.sync_cves(days)
-    background_tasks.add_task(sync_task)
+    """Queue a CVE sync for the sync worker; follow it at /sync-jobs/{job_id}."""
+    job = enqueue_sync_job(db, NVD_SYNC_SOURCE, {"days": days, "backfill": backfill})
+    if job is None:
+        raise HTTPException(status_code=409, detail="A vulnerability sync is already queued or running")
+    if backfill:
+        message = f"Vulnerability backfill for last {days or 1} days has been scheduled"
+    elif days:
+        message = f"Vulnerability sync for CVEs modified in the last {days} days has been scheduled"
+    else:
+        message = "Incremental vulnerability sync since the last watermark has been scheduled"
     return {
         "status": "sync_scheduled",
-        "message": f"Vulnerability sync for last {days} days has been scheduled",
-        "estimated_time": f"~{days * 2} minutes"
+        "job_id": job.id,
+        "message": message,
+        "estimated_time": f"~{(days or 1) * 2} minutes"
     }
 
+def encode_keyset_cursor(ts: Optional[datetime], pk: int) -> str:
+    """Opaque keyset cursor for the position just after the row (ts, pk)."""
+    raw = json.dumps([ts.isoformat() if ts else None, pk], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_keyset_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        ts, pk = json.loads(raw)
+        return (datetime.fromisoformat(ts) if ts else None), int(pk)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+CVE_PAGE_ORDER = (CVE.published_date.desc().nulls_last(), CVE.id.desc())
+
+def keyset_page_queries(query, after: Optional[tuple] = None) -> list:
+    """
+    The page after `after` = (published_date, id) in CVE_PAGE_ORDER, as the
+    queries to run in turn until the page is full: dated rows first, then
+    the NULL tail. Keeping `published_date IS NULL` out of the row
+    comparison lets it be the index condition on the (published_date, id)
+    indexes, so a deep page costs the same as the first one.
+    """
+    published, cve_pk = after or (None, None)
+    queries = []
+    if after is None:
+        queries.append(query.where(CVE.published_date.is_not(None)))
+    elif published is not None:
+        queries.append(query.where(tuple_(CVE.published_date, CVE.id) < tuple_(published, cve_pk)))
+    tail = query.where(CVE.published_date.is_(None))
+    if after is not None and published is None:
+        tail = tail.where(CVE.id < cve_pk)
+    queries.append(tail)
+    return [q.order_by(*CVE_PAGE_ORDER) for q in queries]
+
 async def get_vulnerabilities(
-    limit: int = Query(50, description="Number of CVEs to return"),
+    response: Response,
+    limit: int = Query(50, ge=1, description="Number of CVEs to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
     severity: Optional[str] = Query(None, description="Filter by severity (CRITICAL, HIGH, MEDIUM, LOW)"),
     vendor: Optional[str] = Query(None, description="Filter by vendor"),
     days: Optional[int] = Query(None, description="Filter by days since publication"),
     unanalyzed_only: bool = Query(False, description="Show only unanalyzed CVEs"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> List[CVEResponse]:
-    """Get a list of CVEs, optionally filtered."""
-    query = db.query(CVE)
+    """
+    Get a page of CVEs, newest first, optionally filtered. When more rows may
+    follow, the X-Next-Cursor response header holds the cursor for the next page.
+    """
+    query = select(CVE)
     if severity:
-        query = query.filter(CVE.cvss_v3_severity == severity.upper())
+        query = query.where(CVE.cvss_v3_severity == severity.upper())
     if vendor:
-        query = query.filter(CVE.vendor_project.ilike(f"%{vendor}%"))
+        # exact CPE vendor via the indexed match table, e.g. 'microsoft'
+        query = query.where(
+            CVE.cve_id.in_(select(CpeMatch.cve_id).where(CpeMatch.vendor == cpe_name_part(vendor)))
+        )
     if days:
         since = datetime.utcnow() - timedelta(days=days)
-        query = query.filter(CVE.published_date >= since)
+        query = query.where(CVE.published_date >= since)
     if unanalyzed_only:
-        query = query.filter(CVE.is_analyzed == False)
-    cves = query.order_by(desc(CVE.published_date)).limit(limit).all()
+        query = query.where(CVE.is_analyzed == False)
+    cves = []
+    for page_query in keyset_page_queries(query, decode_keyset_cursor(cursor) if cursor else None):
+        cves += (await db.scalars(page_query.limit(limit - len(cves)))).all()
+        if len(cves) == limit:
+            break
+    if len(cves) == limit:
+        response.headers["X-Next-Cursor"] = encode_keyset_cursor(cves[-1].published_date, cves[-1].id)
     return [
         CVEResponse(
             id=cve.id,
@@ -279,14 +657,112 @@ async def get_vulnerabilities(
         for cve in cves
     ]
 
-async def get_vulnerability_detail(
-    cve_id: str,
-    db: Session = Depends(get_db)
-) -> CVEDetailResponse:
-    """Get detailed information about a single CVE."""
-    cve = db.query(CVE).filter(CVE.cve_id == cve_id).first()
-    if not cve:
-        raise HTTPException(status_code=404, detail="CVE not found")
+CVE_HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=3, MaxWords=25, MinWords=8"
+
+async def search_vulnerabilities(
+    q: str = Query(..., min_length=2, description="Web-search style query, e.g. 'deserialization jenkins -xss'"),
+    limit: int = Query(20, ge=1, le=100),
+    severity: Optional[str] = Query(None, description="Filter by severity (CRITICAL, HIGH, MEDIUM, LOW)"),
+    vendor: Optional[str] = Query(None, description="Filter by vendor"),
+    days: Optional[int] = Query(None, description="Filter by days since publication"),
+    db: AsyncSession = Depends(get_async_db)
+) -> List[CVESearchResult]:
+    """
+    Rank CVEs against the weighted search_vector (GIN) with the filters
+    applied in the same query. Highlights are built only for the returned
+    page, since ts_headline re-parses each description.
+    """
+    tsquery = func.websearch_to_tsquery("english", q)
+    rank = func.ts_rank_cd(CVE.search_vector, tsquery).label("rank")
+    query = select(CVE.id, rank).where(CVE.search_vector.op("@@")(tsquery))
+    if severity:
+        query = query.where(CVE.cvss_v3_severity == severity.upper())
+    if vendor:
+        query = query.where(
+            CVE.cve_id.in_(select(CpeMatch.cve_id).where(CpeMatch.vendor == cpe_name_part(vendor)))
+        )
+    if days:
+        query = query.where(CVE.published_date >= datetime.utcnow() - timedelta(days=days))
+    top = (
+        query.order_by(rank.desc(), CVE.published_date.desc().nulls_last(), CVE.id.desc())
+        .limit(limit)
+        .subquery()
+    )
+
+    headline = func.ts_headline("english", func.coalesce(CVE.description, ""), tsquery, CVE_HEADLINE_OPTIONS)
+    rows = (await db.execute(
+        select(CVE, top.c.rank, headline)
+        .join(top, top.c.id == CVE.id)
+        .order_by(top.c.rank.desc(), CVE.published_date.desc().nulls_last(), CVE.id.desc())
+    )).all()
+    return [
+        CVESearchResult(
+            id=cve.id,
+            cve_id=cve.cve_id,
+            description=cve.description or "",
+            published_date=cve.published_date,
+            cvss_v3_score=cve.cvss_v3_score,
+            cvss_v3_severity=cve.cvss_v3_severity,
+            vendor_project=cve.vendor_project,
+            product=cve.product,
+            cwe_id=cve.cwe_id,
+            attack_vector=cve.attack_vector,
+            is_analyzed=cve.is_analyzed,
+            created_at=cve.created_at,
+            rank=score,
+            highlight=fragment,
+        )
+        for cve, score, fragment in rows
+    ]
+
+async def get_affected_inventory(
+    request: InventoryRequest,
+    db: AsyncSession = Depends(get_async_db)
+) -> List[AffectedInventoryItem]:
+    """
+    Resolve a software inventory (vendor/product/version) to the CVEs whose
+    CPE version ranges contain each version, in one query over the GiST
+    range index.
+    """
+    inventory = [
+        (n, cpe_name_part(item.vendor), cpe_name_part(item.product), version_sort_key(item.version))
+        for n, item in enumerate(request.items)
+    ]
+    inv = values(
+        column("idx", Integer),
+        column("vendor", String),
+        column("product", String),
+        column("version_key", String),
+        name="inventory",
+    ).data(inventory)
+    rows = (await db.execute(
+        select(inv.c.idx, CVE.cve_id, CVE.cvss_v3_score, CVE.cvss_v3_severity, CpeMatch.criteria)
+        .select_from(inv)
+        .join(CpeMatch, and_(
+            CpeMatch.product == inv.c.product,
+            or_(inv.c.vendor.is_(None), CpeMatch.vendor == inv.c.vendor),
+            or_(inv.c.version_key.is_(None), CpeMatch.versions.op("@>")(cast(inv.c.version_key, Text))),
+        ))
+        .join(CVE, CVE.cve_id == CpeMatch.cve_id)
+        .order_by(inv.c.idx, CVE.cvss_v3_score.desc().nullslast(), CVE.cve_id)
+    )).all()
+
+    affecting = {n: {} for n, *_ in inventory}
+    for idx, cve_id, score, severity, criteria in rows:
+        affecting[idx].setdefault(cve_id, AffectingCVE(
+            cve_id=cve_id, cvss_v3_score=score, cvss_v3_severity=severity, criteria=criteria
+        ))
+    return [
+        AffectedInventoryItem(
+            vendor=item.vendor,
+            product=item.product,
+            version=item.version,
+            cves=list(affecting[n].values()),
+        )
+        for n, item in enumerate(request.items)
+    ]
+
+def to_cve_detail_response(cve: CVE) -> CVEDetailResponse:
     return CVEDetailResponse(
         id=cve.id,
         cve_id=cve.cve_id,
@@ -313,29 +789,131 @@ async def get_vulnerability_detail(
         created_at=cve.created_at
     )
 
-async def get_vulnerability_stats(db: Session = Depends(get_db)) -> VulnerabilityStats:
-    """Get aggregate CVE statistics."""
-    total_cves = db.query(CVE).count()
-    critical_count = db.query(CVE).filter(CVE.cvss_v3_severity == "CRITICAL").count()
-    high_count = db.query(CVE).filter(CVE.cvss_v3_severity == "HIGH").count()
-    medium_count = db.query(CVE).filter(CVE.cvss_v3_severity == "MEDIUM").count()
-    low_count = db.query(CVE).filter(CVE.cvss_v3_severity == "LOW").count()
-    recent_7_days = db.query(CVE).filter(
-        CVE.published_date >= datetime.utcnow() - timedelta(days=7)
-    ).count()
-    unanalyzed_count = db.query(CVE).filter(CVE.is_analyzed == False).count()
+async def get_vulnerability_detail(
+    cve_id: str,
+    db: AsyncSession = Depends(get_async_db)
+) -> CVEDetailResponse:
+    """Get detailed information about a single CVE."""
+    cve = await db.scalar(select(CVE).where(CVE.cve_id == cve_id))
+    if not cve:
+        raise HTTPException(status_code=404, detail="CVE not found")
+    return to_cve_detail_response(cve)
+
+async def get_vulnerabilities_batch(
+    request: CVEBatchRequest,
+    db: AsyncSession = Depends(get_async_db)
+) -> StreamingResponse:
+    """
+    Resolve many CVE ids with one `cve_id = ANY(:ids)` query. The body is
+    streamed as {"found": [CVEDetailResponse, ...], "not_found": [id, ...]},
+    both in request order with duplicates removed.
+    """
+    cve_ids = list(dict.fromkeys(i.strip().upper() for i in request.cve_ids if i.strip()))
+    by_id = {
+        cve.cve_id: cve
+        for cve in await db.scalars(select(CVE).where(CVE.cve_id == func.any(cast(cve_ids, ARRAY(String)))))
+    }
+    not_found = [i for i in cve_ids if i not in by_id]
+
+    def body():
+        yield b'{"found":['
+        for n, cve_id in enumerate(i for i in cve_ids if i in by_id):
+            yield (b"," if n else b"") + to_cve_detail_response(by_id[cve_id]).model_dump_json().encode()
+        yield b'],"not_found":' + json.dumps(not_found).encode() + b"}"
+
+    return StreamingResponse(body(), media_type="application/json")
+
+# ----------------------
+# Statistics cache
+# ----------------------
+STATS_CACHE_TTL = 60.0  # bounds staleness of the time-based recent_7_days count
+STATS_GROUP_LIMIT = 50
+STATS_GROUP_BY = ("cwe", "attack_vector", "vendor")
+_stats_cache: Dict[Optional[str], tuple] = {}
+_stats_cache_lock = threading.Lock()
+
+def invalidate_stats_cache():
+    with _stats_cache_lock:
+        _stats_cache.clear()
+
+def _severity_counts(total):
+    """COUNT(*) and per-severity COUNT(*) FILTER expressions over `total`'s rows."""
+    return [
+        func.count(total).label("total"),
+        func.count(total).filter(CVE.cvss_v3_severity == "CRITICAL").label("critical"),
+        func.count(total).filter(CVE.cvss_v3_severity == "HIGH").label("high"),
+        func.count(total).filter(CVE.cvss_v3_severity == "MEDIUM").label("medium"),
+        func.count(total).filter(CVE.cvss_v3_severity == "LOW").label("low"),
+    ]
+
+def compute_vulnerability_stats(db: Session, group_by: Optional[str] = None) -> VulnerabilityStats:
+    """All headline counts in one pass over cves, plus an optional grouped breakdown."""
+    totals = db.query(
+        *_severity_counts(CVE.id),
+        func.count(CVE.id).filter(
+            CVE.published_date >= datetime.utcnow() - timedelta(days=7)
+        ).label("recent_7_days"),
+        func.count(CVE.id).filter(CVE.is_analyzed.is_(False)).label("unanalyzed"),
+    ).one()
+
+    groups = None
+    if group_by == "vendor":
+        # a CVE lists many CPEs per vendor; count each (vendor, cve) once
+        pairs = select(CpeMatch.vendor, CpeMatch.cve_id).distinct().subquery()
+        key = pairs.c.vendor
+        query = db.query(key, *_severity_counts(CVE.id)).select_from(pairs).join(CVE, CVE.cve_id == pairs.c.cve_id)
+    elif group_by:
+        key = CVE.cwe_id if group_by == "cwe" else CVE.attack_vector
+        query = db.query(key, *_severity_counts(CVE.id)).filter(key.isnot(None))
+    if group_by:
+        rows = query.group_by(key).order_by(func.count(CVE.id).desc(), key).limit(STATS_GROUP_LIMIT).all()
+        groups = [
+            VulnerabilityStatsGroup(
+                key=k, total=total, critical_count=critical, high_count=high,
+                medium_count=medium, low_count=low,
+            )
+            for k, total, critical, high, medium, low in rows
+        ]
+
     return VulnerabilityStats(
-        total_cves=total_cves,
-        critical_count=critical_count,
-        high_count=high_count,
-        medium_count=medium_count,
-        low_count=low_count,
-        recent_7_days=recent_7_days,
-        unanalyzed_count=unanalyzed_count,
-        last_updated=datetime.utcnow().isoformat()
+        total_cves=totals.total,
+        critical_count=totals.critical,
+        high_count=totals.high,
+        medium_count=totals.medium,
+        low_count=totals.low,
+        recent_7_days=totals.recent_7_days,
+        unanalyzed_count=totals.unanalyzed,
+        last_updated=datetime.utcnow().isoformat(),
+        group_by=group_by,
+        groups=groups,
     )
 
-async def mark_analyzed(
+def get_cached_vulnerability_stats(db: Session, group_by: Optional[str] = None) -> VulnerabilityStats:
+    """
+    Serve stats from a per-process cache keyed by group_by. Entries are
+    dropped when the 'nvd' sync_state version moves (any worker's sync or
+    analysis update) and after STATS_CACHE_TTL.
+    """
+    version = crud.get_sync_version(db, NVD_SYNC_SOURCE)
+    now = time.monotonic()
+    entry = _stats_cache.get(group_by)
+    if entry and entry[0] == version and now - entry[1] < STATS_CACHE_TTL:
+        return entry[2]
+    stats = compute_vulnerability_stats(db, group_by)
+    with _stats_cache_lock:
+        _stats_cache[group_by] = (version, now, stats)
+    return stats
+
+async def get_vulnerability_stats(
+    group_by: Optional[str] = Query(None, description="Optional breakdown: cwe, attack_vector or vendor"),
+    db: AsyncSession = Depends(get_async_db)
+) -> VulnerabilityStats:
+    """Get aggregate CVE statistics."""
+    if group_by and group_by not in STATS_GROUP_BY:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(STATS_GROUP_BY)}")
+    return await db.run_sync(get_cached_vulnerability_stats, group_by)
+
+def mark_analyzed(
     cve_id: str,
     db: Session = Depends(get_db)
 ):
@@ -344,29 +922,215 @@ async def mark_analyzed(
     if not cve:
         raise HTTPException(status_code=404, detail="CVE not found")
     cve.is_analyzed = True
+    crud.bump_sync_version(db, NVD_SYNC_SOURCE)
     db.commit()
+    invalidate_stats_cache()
     return {"status": "success", "message": f"CVE {cve_id} marked as analyzed"}
 
+def to_alert_response(alert: VulnerabilityAlert) -> AlertResponse:
+    return AlertResponse(
+        id=alert.id,
+        cve_id=alert.cve_id,
+        alert_type=alert.alert_type,
+        message=alert.message,
+        is_read=alert.is_read,
+        created_at=alert.created_at,
+        vendor=alert.vendor,
+        watchlist_entry_id=alert.watchlist_entry_id,
+        severity=alert.severity,
+        cvss_v3_score=alert.cvss_v3_score,
+    )
+
 async def get_alerts(
-    limit: int = Query(20, description="Number of alerts to return"),
+    response: Response,
+    limit: int = Query(20, ge=1, description="Number of alerts to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
     unread_only: bool = Query(False, description="Show only unread alerts"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> List[AlertResponse]:
-    """Fetch vulnerability alerts."""
-    query = db.query(VulnerabilityAlert)
+    """Fetch vulnerability alerts, newest first, one keyset page at a time."""
+    query = select(VulnerabilityAlert)
     if unread_only:
-        query = query.filter(VulnerabilityAlert.is_read == False)
-    alerts = query.order_by(desc(VulnerabilityAlert.created_at)).limit(limit).all()
+        query = query.where(VulnerabilityAlert.is_read == False)
+    if cursor:
+        created_at, alert_id = decode_keyset_cursor(cursor)
+        query = query.where(
+            tuple_(VulnerabilityAlert.created_at, VulnerabilityAlert.id) < tuple_(created_at, alert_id)
+        )
+    alerts = (await db.scalars(
+        query.order_by(desc(VulnerabilityAlert.created_at), desc(VulnerabilityAlert.id)).limit(limit)
+    )).all()
+    if len(alerts) == limit:
+        response.headers["X-Next-Cursor"] = encode_keyset_cursor(alerts[-1].created_at, alerts[-1].id)
+    return [to_alert_response(alert) for alert in alerts]
+
+ALERT_STREAM_BATCH_SIZE = 100
+# Comment frames keep proxies from closing idle streams; each one is also a
+# catch-up read, bounding latency when no NOTIFY/in-process wake-up arrives.
+ALERT_STREAM_KEEPALIVE_SECONDS = 15.0
+
+async def _alerts_after(alert_id: int, limit: int) -> List[AlertResponse]:
+    # short-lived session so an idle stream never holds a pooled connection
+    async with AsyncSessionLocal() as db:
+        alerts = await db.scalars(
+            select(VulnerabilityAlert)
+            .where(VulnerabilityAlert.id > alert_id)
+            .order_by(VulnerabilityAlert.id)
+            .limit(limit)
+        )
+        return [to_alert_response(alert) for alert in alerts]
+
+async def _latest_alert_id() -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.max(VulnerabilityAlert.id))) or 0
+
+async def stream_alerts(
+    request: Request,
+    since_id: Optional[int] = Query(None, ge=0, description="Replay alerts with a greater id first"),
+    last_event_id: Optional[str] = Header(None, description="Sent by EventSource when it reconnects"),
+) -> StreamingResponse:
+    """
+    Server-Sent Events stream of new alerts ('alert' events, id = alert id).
+    Resumes after Last-Event-ID or since_id; without either it starts at the
+    newest alert. A connection is woken by NOTIFY/in-process fan-out and then
+    pages through the alerts it has not sent, so a slow client only slows its
+    own reads (the send awaits the socket) and wake-ups never pile up.
+    """
+    if last_event_id and last_event_id.isdigit():
+        start_id = int(last_event_id)
+    elif since_id is not None:
+        start_id = since_id
+    else:
+        start_id = await _latest_alert_id()
+
+    async def events():
+        last_id = start_id
+        subscription = broadcaster.subscribe()
+        try:
+            yield b"retry: 5000\n\n"
+            while not await request.is_disconnected():
+                batch = await _alerts_after(last_id, ALERT_STREAM_BATCH_SIZE)
+                for alert in batch:
+                    yield f"id: {alert.id}\nevent: alert\ndata: {alert.model_dump_json()}\n\n".encode()
+                    last_id = alert.id
+                if len(batch) == ALERT_STREAM_BATCH_SIZE:
+                    continue  # still catching up
+                if not await subscription.wait(ALERT_STREAM_KEEPALIVE_SECONDS):
+                    yield b": keepalive\n\n"
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def get_alert_digests(
+    response: Response,
+    limit: int = Query(20, ge=1, description="Number of digests to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    unread_only: bool = Query(False, description="Show only digests with unread alerts"),
+    db: AsyncSession = Depends(get_async_db)
+) -> List[AlertDigestResponse]:
+    """Watchlist alerts grouped per vendor and severity, newest window first."""
+    query = select(AlertDigest)
+    if unread_only:
+        query = query.where(AlertDigest.is_read == False)
+    if cursor:
+        window_start, digest_id = decode_keyset_cursor(cursor)
+        query = query.where(tuple_(AlertDigest.window_start, AlertDigest.id) < tuple_(window_start, digest_id))
+    digests = (await db.scalars(
+        query.order_by(desc(AlertDigest.window_start), desc(AlertDigest.id)).limit(limit)
+    )).all()
+    if len(digests) == limit:
+        response.headers["X-Next-Cursor"] = encode_keyset_cursor(digests[-1].window_start, digests[-1].id)
     return [
-        AlertResponse(
-            id=alert.id,
-            cve_id=alert.cve_id,
-            alert_type=alert.alert_type,
-            message=alert.message,
-            is_read=alert.is_read,
-            created_at=alert.created_at
+        AlertDigestResponse(
+            id=d.id,
+            watchlist_entry_id=d.watchlist_entry_id,
+            vendor=d.vendor,
+            severity=d.severity,
+            window_start=d.window_start,
+            window_minutes=d.window_minutes,
+            alert_count=d.alert_count,
+            max_cvss_score=d.max_cvss_score,
+            cve_ids=d.cve_ids,
+            is_read=d.is_read,
+            updated_at=d.updated_at,
         )
-        for alert in alerts
+        for d in digests
+    ]
+
+def mark_alerts_read(
+    up_to_id: Optional[int] = Query(None, description="Only alerts with an id up to this one, i.e. those already seen"),
+    watchlist_entry_id: Optional[int] = Query(None, description="Only alerts of this watchlist entry"),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """Mark unread alerts, and the digests covering them, read with one UPDATE each."""
+    alerts = VulnerabilityAlert.__table__
+    condition = [alerts.c.is_read == False]
+    if up_to_id is not None:
+        condition.append(alerts.c.id <= up_to_id)
+    if watchlist_entry_id is not None:
+        condition.append(alerts.c.watchlist_entry_id == watchlist_entry_id)
+    marked = db.execute(alerts.update().where(*condition).values(is_read=True)).rowcount
+
+    digests = AlertDigest.__table__
+    digest_condition = [digests.c.is_read == False]
+    if watchlist_entry_id is not None:
+        digest_condition.append(digests.c.watchlist_entry_id == watchlist_entry_id)
+    if up_to_id is not None:
+        # a digest is read once none of its alerts is left unread
+        digest_condition.append(~select(alerts.c.id).where(
+            alerts.c.is_read == False,
+            alerts.c.watchlist_entry_id == digests.c.watchlist_entry_id,
+            alerts.c.cve_id == func.any(digests.c.cve_ids),
+        ).exists())
+    digests_marked = db.execute(digests.update().where(*digest_condition).values(is_read=True)).rowcount
+    db.commit()
+    return {"status": "success", "alerts_marked": marked, "digests_marked": digests_marked}
+
+def import_nvd_feeds(
+    pattern: str = Query("nvdcve-2.0-*.json*", description="Glob of feed files inside NVD_FEED_DIR"),
+    workers: Optional[int] = Query(None, ge=1, description="Worker processes (default: CPU count)"),
+    db: Session = Depends(get_db),
+):
+    """
+    Queue an offline import of NVD 2.0 JSON feed files from NVD_FEED_DIR for
+    the sync worker, which runs the process pool; follow it at /sync-jobs/{job_id}.
+    """
+    from .services.nvd_feed_importer import FEED_SYNC_SOURCE, find_feed_files
+
+    if not NVD_FEED_DIR:
+        raise HTTPException(status_code=400, detail="NVD_FEED_DIR is not configured")
+    if "/" in pattern or "\\" in pattern or ".." in pattern:
+        raise HTTPException(status_code=400, detail="pattern must be a file name glob")
+    files = find_feed_files(NVD_FEED_DIR, pattern)
+    if not files:
+        raise HTTPException(status_code=404, detail="No feed files matched")
+    job = enqueue_sync_job(db, FEED_SYNC_SOURCE, {"pattern": pattern, "workers": workers})
+    if job is None:
+        raise HTTPException(status_code=409, detail="An NVD feed import is already queued or running")
+    return {
+        "status": "import_scheduled",
+        "job_id": job.id,
+        "message": f"Import of {len(files)} NVD feed files has been scheduled",
+        "files": [os.path.basename(f) for f in files],
+    }
+
+async def get_feed_import_status(db: AsyncSession = Depends(get_async_db)):
+    """Per-file progress of offline NVD feed imports."""
+    imports = await db.scalars(select(NVDFeedImport).order_by(NVDFeedImport.filename))
+    return [
+        {
+            "filename": i.filename,
+            "file_size": i.file_size,
+            "items_done": i.items_done,
+            "started_at": i.started_at,
+            "completed_at": i.completed_at,
+        }
+        for i in imports
     ]
 
 # ----------------------
@@ -374,8 +1138,17 @@ async def get_alerts(
 # ----------------------
 def register_vulnerability_routes(app):
     app.add_api_route("/api/vulnerabilities/sync", sync_vulnerabilities, methods=["POST"])
+    app.add_api_route("/api/vulnerabilities/import-feeds", import_nvd_feeds, methods=["POST"])
+    app.add_api_route("/api/vulnerabilities/import-feeds", get_feed_import_status, methods=["GET"])
+    app.add_api_route("/api/vulnerabilities/affected", get_affected_inventory, methods=["POST"])
     app.add_api_route("/api/vulnerabilities", get_vulnerabilities, methods=["GET"])
-    app.add_api_route("/api/vulnerabilities/{cve_id}", get_vulnerability_detail, methods=["GET"])
+    # fixed paths must be registered before /{cve_id} or they are matched as CVE ids
+    app.add_api_route("/api/vulnerabilities/batch", get_vulnerabilities_batch, methods=["POST"])
+    app.add_api_route("/api/vulnerabilities/search", search_vulnerabilities, methods=["GET"])
     app.add_api_route("/api/vulnerabilities/stats", get_vulnerability_stats, methods=["GET"])
-    app.add_api_route("/api/vulnerabilities/{cve_id}/analyze", mark_analyzed, methods=["POST"])
     app.add_api_route("/api/vulnerabilities/alerts", get_alerts, methods=["GET"])
+    app.add_api_route("/api/vulnerabilities/alerts/stream", stream_alerts, methods=["GET"])
+    app.add_api_route("/api/vulnerabilities/alerts/digests", get_alert_digests, methods=["GET"])
+    app.add_api_route("/api/vulnerabilities/alerts/mark-read", mark_alerts_read, methods=["POST"])
+    app.add_api_route("/api/vulnerabilities/{cve_id}", get_vulnerability_detail, methods=["GET"])
+    app.add_api_route("/api/vulnerabilities/{cve_id}/analyze", mark_analyzed, methods=["POST"])
@@ -0,0 +1,88 @@
+# app/services/alert_pipeline.py
+
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from core.config import ALERT_DIGEST_WINDOW_MINUTES
+from ..models import AlertDigest, VulnerabilityAlert
+from .alert_stream import announce_alerts
+
+
+def alert_dedup_key(alert: dict) -> str:
+    """One alert per (type, watchlist entry, CVE), however often NVD re-publishes it."""
+    return f"{alert['alert_type']}:{alert.get('watchlist_entry_id') or ''}:{alert['cve_id']}"
+
+
+def digest_window_start(ts: datetime, window_minutes: int) -> datetime:
+    epoch = datetime(1970, 1, 1)
+    window = timedelta(minutes=window_minutes)
+    return epoch + ((ts - epoch) // window) * window
+
+
+def store_alerts(db: Session, alerts: List[dict], window_minutes: int = ALERT_DIGEST_WINDOW_MINUTES) -> int:
+    """
+    Bulk-insert alerts in one INSERT ... ON CONFLICT (dedup_key) DO NOTHING,
+    then fold the rows that were actually inserted into per vendor/severity
+    digests for the current window with one upsert. Streaming connections
+    are woken once the transaction commits. Returns the number of new alerts.
+    """
+    if not alerts:
+        return 0
+    rows = {}
+    for alert in alerts:
+        rows.setdefault(alert_dedup_key(alert), {**alert, "dedup_key": alert_dedup_key(alert)})
+    table = VulnerabilityAlert.__table__
+    inserted = dict(db.execute(
+        pg_insert(table)
+        .values(list(rows.values()))
+        .on_conflict_do_nothing(index_elements=[table.c.dedup_key])
+        .returning(table.c.dedup_key, table.c.id)
+    ).all())
+    if inserted:
+        announce_alerts(db, max(inserted.values()))
+
+    digests = {}
+    for key in inserted:
+        alert = rows[key]
+        if alert.get("watchlist_entry_id") is None:
+            continue
+        window_start = digest_window_start(alert["created_at"], window_minutes)
+        severity = alert.get("severity") or "NONE"
+        digest = digests.setdefault((alert["watchlist_entry_id"], severity, window_start), {
+            "watchlist_entry_id": alert["watchlist_entry_id"],
+            "vendor": alert.get("vendor"),
+            "severity": severity,
+            "window_start": window_start,
+            "window_minutes": window_minutes,
+            "alert_count": 0,
+            "max_cvss_score": None,
+            "cve_ids": [],
+            "is_read": False,
+            "created_at": alert["created_at"],
+            "updated_at": alert["created_at"],
+        })
+        digest["alert_count"] += 1
+        digest["cve_ids"].append(alert["cve_id"])
+        score = alert.get("cvss_v3_score")
+        if score is not None and (digest["max_cvss_score"] is None or score > digest["max_cvss_score"]):
+            digest["max_cvss_score"] = score
+
+    if digests:
+        digest_table = AlertDigest.__table__
+        upsert = pg_insert(digest_table).values(list(digests.values()))
+        db.execute(upsert.on_conflict_do_update(
+            index_elements=[digest_table.c.watchlist_entry_id, digest_table.c.severity, digest_table.c.window_start],
+            set_={
+                "vendor": upsert.excluded.vendor,
+                "alert_count": digest_table.c.alert_count + upsert.excluded.alert_count,
+                "max_cvss_score": func.greatest(digest_table.c.max_cvss_score, upsert.excluded.max_cvss_score),
+                "cve_ids": digest_table.c.cve_ids.op("||")(upsert.excluded.cve_ids),
+                "is_read": False,
+                "updated_at": upsert.excluded.updated_at,
+            },
+        ))
+    return len(inserted)
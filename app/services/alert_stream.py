@@ -0,0 +1,159 @@
+# app/services/alert_stream.py
+
+import asyncio
+import logging
+import select
+import threading
+from typing import Optional
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY channel; the payload is the highest alert id of the committed batch
+ALERT_CHANNEL = "vulnerability_alerts"
+LISTEN_POLL_SECONDS = 5.0
+LISTEN_RETRY_SECONDS = 5.0
+# Session.info key of the highest alert id announced in the open transaction
+_PENDING_ALERT_ID = "pending_alert_id"
+
+
+class _Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.event = asyncio.Event()
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for a wake-up; False on timeout. Wake-ups arriving while the
+        connection is busy coalesce into one, so a slow reader never queues."""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self.event.clear()
+        return True
+
+
+class AlertBroadcaster:
+    """
+    Wakes streaming connections when alerts with a higher id have been
+    committed. Only the latest id is kept: each connection then reads the
+    alerts it has not sent yet from the database at its own pace.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.latest_id = 0
+
+    def subscribe(self) -> _Subscription:
+        sub = _Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: _Subscription):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, alert_id: int):
+        """Thread-safe; called from request threads, the LISTEN thread and sync jobs."""
+        with self._lock:
+            self.latest_id = max(self.latest_id, alert_id)
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.event.set)
+            except RuntimeError:  # loop already closed
+                self.unsubscribe(sub)
+
+
+broadcaster = AlertBroadcaster()
+
+
+def announce_alerts(db: Session, max_alert_id: int):
+    """
+    Announce alerts written in the current transaction once it commits:
+    NOTIFY reaches listeners in every process (Postgres delivers it on
+    commit), and the in-process broadcaster covers this process when no
+    LISTEN connection is running.
+    """
+    db.execute(func.pg_notify(ALERT_CHANNEL, str(max_alert_id)).select())
+    db.info[_PENDING_ALERT_ID] = max(db.info.get(_PENDING_ALERT_ID, 0), max_alert_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_alerts(session: Session):
+    alert_id = session.info.pop(_PENDING_ALERT_ID, None)
+    if alert_id is not None:
+        broadcaster.publish(alert_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_alerts(session: Session):
+    # the alerts (and Postgres' NOTIFY) went away with the transaction
+    session.info.pop(_PENDING_ALERT_ID, None)
+
+
+class AlertListener(threading.Thread):
+    """Relays NOTIFYs on ALERT_CHANNEL to the broadcaster over a dedicated psycopg2 connection."""
+
+    def __init__(self, engine):
+        super().__init__(name="alert-listener", daemon=True)
+        self.engine = engine
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self._listen()
+            except Exception as e:
+                logger.error(f"Alert LISTEN connection failed: {e}; retrying in {LISTEN_RETRY_SECONDS}s")
+                self._stop_event.wait(LISTEN_RETRY_SECONDS)
+
+    def _listen(self):
+        raw = self.engine.raw_connection()
+        try:
+            conn = raw.driver_connection
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {ALERT_CHANNEL}")
+            while not self._stop_event.is_set():
+                if select.select([conn], [], [], LISTEN_POLL_SECONDS) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    note = conn.notifies.pop(0)
+                    try:
+                        broadcaster.publish(int(note.payload))
+                    except ValueError:
+                        continue
+        finally:
+            raw.invalidate()
+
+
+_listener: Optional[AlertListener] = None
+
+
+def start_alert_listener(engine) -> bool:
+    """Start relaying NOTIFYs when the driver supports it (psycopg2); False means in-process only."""
+    global _listener
+    if engine.dialect.name != "postgresql" or engine.dialect.driver != "psycopg2":
+        logger.info("Alert streaming uses in-process fan-out only (no psycopg2 LISTEN support)")
+        return False
+    if _listener is None or not _listener.is_alive():
+        _listener = AlertListener(engine)
+        _listener.start()
+    return True
+
+
+def stop_alert_listener(timeout: float = LISTEN_POLL_SECONDS + 1):
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener.join(timeout)
+        _listener = None
@@ -1,45 +1,103 @@
 # app/services/breach_service.py
 
+import hashlib
+import json
 import requests
 from datetime import datetime
 from sqlalchemy.orm import Session
-from ..crud import upsert_breach
+from .. import crud
+from .domain_utils import registrable_domain, reversed_domain_key
+from core.config import HIBP_URL
 
-HIBP_URL = "https://haveibeenpwned.com/api/v3/breaches"
 HEADERS = {"user-agent": "VendorRiskApp/1.0"}
+SYNC_SOURCE = "hibp"
 
-def fetch_all_hibp_breaches(db: Session) -> int:
-    resp = requests.get(HIBP_URL, headers=HEADERS)
+def _parse_breach(b: dict) -> dict:
+    breach_date = (
+        datetime.strptime(b["BreachDate"], "%Y-%m-%d").date()
+        if b.get("BreachDate")
+        else None
+    )
+    added_date = (
+        datetime.strptime(b["AddedDate"][:10], "%Y-%m-%d").date()
+        if b.get("AddedDate")
+        else None
+    )
+    return {
+        "name": b.get("Name", ""),
+        "title": b.get("Title", "") or b.get("Name", ""),
+        "domain": b.get("Domain", ""),
+        "breach_date": breach_date,
+        "added_date": added_date,
+        "pwn_count": b.get("PwnCount", 0),
+        "description": b.get("Description", ""),
+        "data_classes": ";".join(b.get("DataClasses", [])),
+        "is_verified": b.get("IsVerified", False),
+        "is_fabricated": b.get("IsFabricated", False),
+        "is_sensitive": b.get("IsSensitive", False),
+        "is_retired": b.get("IsRetired", False),
+        "is_spam_list": b.get("IsSpamList", False),
+    }
+
+def breach_content_hash(data: dict) -> str:
+    canonical = json.dumps(data, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def fetch_all_hibp_breaches(db: Session, force: bool = False) -> dict:
+    """
+    Conditionally download the HIBP catalogue and write only the breaches whose
+    content hash changed. The ETag/Last-Modified of the last successful sync are
+    replayed as If-None-Match/If-Modified-Since, so an unchanged catalogue costs
+    a single 304 round trip.
+    """
+    headers = dict(HEADERS)
+    state = crud.get_sync_state(db, SYNC_SOURCE)
+    if state and not force:
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+
+    resp = requests.get(HIBP_URL, headers=headers, timeout=30)
+    if resp.status_code == 304:
+        crud.save_sync_state(db, SYNC_SOURCE)
+        db.commit()
+        return {"count": 0, "inserted": 0, "updated": 0, "unchanged": 0, "not_modified": True}
     resp.raise_for_status()
     breaches_data = resp.json()
 
-    count = 0
+    known_hashes = crud.get_breach_hashes(db)
+    rows = []
     for b in breaches_data:
-        breach_date = (
-            datetime.strptime(b["BreachDate"], "%Y-%m-%d").date()
-            if b.get("BreachDate")
-            else None
-        )
-        added_date = (
-            datetime.strptime(b["AddedDate"][:10], "%Y-%m-%d").date()
-            if b.get("AddedDate")
-            else None
+        data = _parse_breach(b)
+        # hash only what HIBP sent, so normalizer changes don't look like upstream changes
+        data["content_hash"] = breach_content_hash(data)
+        data["registrable_domain"] = registrable_domain(data["domain"])
+        data["domain_key"] = reversed_domain_key(data["domain"]) or ""
+        if known_hashes.get(data["name"]) != data["content_hash"]:
+            rows.append(data)
+
+    if rows:
+        class_ids = crud.ensure_data_classes(
+            db, (c for r in rows for c in crud.split_data_classes(r["data_classes"]))
         )
-        data = {
-            "name": b.get("Name", ""),
-            "title": b.get("Title", "") or b.get("Name", ""),
-            "domain": b.get("Domain", ""),
-            "breach_date": breach_date,
-            "added_date": added_date,
-            "pwn_count": b.get("PwnCount", 0),
-            "description": b.get("Description", ""),
-            "data_classes": ";".join(b.get("DataClasses", [])),
-            "is_verified": b.get("IsVerified", False),
-            "is_fabricated": b.get("IsFabricated", False),
-            "is_sensitive": b.get("IsSensitive", False),
-            "is_retired": b.get("IsRetired", False),
-            "is_spam_list": b.get("IsSpamList", False),
-        }
-        upsert_breach(db, data)
-        count += 1
-    return count
+        for r in rows:
+            r["data_class_ids"] = sorted({class_ids[c] for c in crud.split_data_classes(r["data_classes"])})
+
+    result = crud.bulk_upsert_breaches(db, rows, commit=False)
+    changed = bool(result["inserted"] or result["updated"])
+    if changed:
+        crud.refresh_breach_stats(db, commit=False)
+    crud.save_sync_state(
+        db,
+        SYNC_SOURCE,
+        bump_version=changed,
+        etag=resp.headers.get("ETag"),
+        last_modified=resp.headers.get("Last-Modified"),
+    )
+    db.commit()
+
+    result["unchanged"] += len(breaches_data) - len(rows)
+    result["count"] = len(breaches_data)
+    result["not_modified"] = False
+    return result
@@ -0,0 +1,194 @@
+# app/services/breach_snapshot.py
+
+import asyncio
+import bisect
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .. import crud, models, schemas
+from .domain_utils import ancestor_keys
+
+SNAPSHOT_SOURCE = "hibp"
+# How often each worker polls sync_state.version for a newer catalogue
+VERSION_CHECK_INTERVAL = 5.0
+
+def to_breach_response(b: models.Breach) -> schemas.BreachResponse:
+    return schemas.BreachResponse(
+        id=b.id,
+        name=b.name,
+        title=b.title or b.name,
+        domain=b.domain,
+        breach_date=str(b.breach_date) if b.breach_date else None,
+        added_date=str(b.added_date) if b.added_date else None,
+        pwn_count=b.pwn_count,
+        description=b.description or "",
+        data_classes=b.data_classes or "",
+        is_verified=b.is_verified,
+        is_fabricated=b.is_fabricated,
+    )
+
+
+def breach_json(breaches) -> dict:
+    """Serialized BreachResponse bodies by breach id."""
+    return {b.id: to_breach_response(b).model_dump_json().encode() for b in breaches}
+
+
+class BreachSnapshot:
+    """
+    Read-only view of the breaches table for one sync version. Every breach
+    and the cached stats rollup are serialized to JSON once at build time;
+    lookups only index into dicts and join byte strings. Details, domain
+    lookups, stats and substring search are answered from memory alone;
+    fulltext, fuzzy and auto search rank in Postgres and render from here.
+    Instances are never mutated after __init__, so they can be shared between
+    threads without locking.
+    """
+
+    def __init__(self, version: int, breaches: list, data_classes: dict, stats: dict):
+        self.version = version
+        self.built_at = datetime.utcnow()
+        # breaches arrive ordered by pwn_count desc, which is the default result order
+        self.order = tuple(b.id for b in breaches)
+        self.data_classes = dict(data_classes)  # name -> id
+        self.data_class_names = {v: k for k, v in self.data_classes.items()}
+        # one bit per DataClass id, so class filters are a single AND per breach
+        self.class_masks = {}
+        self.domain_index = {}
+        self.haystacks = {}
+
+        self.json_by_id = breach_json(breaches)
+        for b in breaches:
+            if b.domain_key:
+                self.domain_index.setdefault(b.domain_key, []).append(b.id)
+            self.haystacks[b.id] = " ".join(
+                (b.name or "", b.title or "", b.domain or "", b.description or "")
+            ).lower()
+            self.class_masks[b.id] = sum(1 << c for c in (b.data_class_ids or ()))
+
+        self.domain_keys = tuple(sorted(self.domain_index))
+
+        self.stats_json = schemas.BreachStats(**stats).model_dump_json().encode()
+
+    def get(self, breach_id: int) -> Optional[bytes]:
+        return self.json_by_id.get(breach_id)
+
+    def missing(self, ids) -> list:
+        """Ids this snapshot has no row for, e.g. breaches synced after it was built."""
+        return [i for i in ids if i not in self.json_by_id]
+
+    def render(self, ids, extra: Optional[dict] = None) -> bytes:
+        """JSON array of the given breaches; `extra` holds bodies of ids missing here."""
+        extra = extra or {}
+        bodies = (self.json_by_id.get(i) or extra.get(i) for i in ids)
+        return b"[" + b",".join(body for body in bodies if body) + b"]"
+
+    def by_domain(self, domain: str) -> list:
+        """
+        Breaches on the given host, its subdomains, and its parents up to the
+        registrable domain: 'mail.example.com' matches 'example.com' and
+        'eu.mail.example.com' but not 'apex.com'.
+        """
+        keys = ancestor_keys(domain)
+        if not keys:
+            return []
+        matched = set()
+        for key in keys:
+            matched.update(self.domain_index.get(key, ()))
+        prefix = keys[0] + "."
+        start = bisect.bisect_left(self.domain_keys, prefix)
+        for key in self.domain_keys[start:]:
+            if not key.startswith(prefix):
+                break
+            matched.update(self.domain_index[key])
+        return [i for i in self.order if i in matched]
+
+    def class_mask(self, ids) -> int:
+        return sum(1 << c for c in ids)
+
+    def _matches(self, term: str, mode: str) -> Optional[list]:
+        """
+        Return all matching ids in rank order, or None when the mode needs
+        Postgres: fulltext/auto rely on websearch_to_tsquery (stemming,
+        quoted phrases, OR, -negation) and fuzzy on trigram similarity.
+        """
+        if mode != "substring":
+            return None
+        needle = term.lower()
+        return [i for i in self.order if needle in self.haystacks[i]]
+
+    def _filter(self, ids: list, mask: int, match_all: bool) -> list:
+        if not mask:
+            return ids
+        masks = self.class_masks
+        if match_all:
+            return [i for i in ids if masks[i] & mask == mask]
+        return [i for i in ids if masks[i] & mask]
+
+    def search(
+        self, term: str, limit: int, mode: str, mask: int = 0, match_all: bool = False
+    ) -> Optional[list]:
+        ids = self._matches(term, mode)
+        if ids is None:
+            return None
+        return self._filter(ids, mask, match_all)[:limit]
+
+    def facets(
+        self, term: str, mode: str, mask: int = 0, match_all: bool = False
+    ) -> Optional[dict]:
+        """Count matching breaches per data class, or None if Postgres must answer."""
+        ids = self._matches(term, mode)
+        if ids is None:
+            return None
+        counts = {}
+        for i in self._filter(ids, mask, match_all):
+            bits = self.class_masks[i]
+            while bits:
+                low = bits & -bits
+                class_id = low.bit_length() - 1
+                counts[class_id] = counts.get(class_id, 0) + 1
+                bits ^= low
+        ranked = sorted(counts.items(), key=lambda kv: (-kv[1], self.data_class_names[kv[0]]))
+        return {self.data_class_names[c]: n for c, n in ranked}
+
+
+_snapshot: Optional[BreachSnapshot] = None
+_checked_at = 0.0
+# rebuilds run on the event loop, so one asyncio lock serializes them
+_lock = asyncio.Lock()
+
+
+def _rebuild(db: Session, version: int) -> BreachSnapshot:
+    global _snapshot, _checked_at
+    _snapshot = BreachSnapshot(
+        version,
+        crud.get_all_breaches(db),
+        crud.get_data_classes(db),
+        crud.get_cached_breach_stats(db),
+    )
+    _checked_at = time.monotonic()
+    return _snapshot
+
+
+async def get_snapshot(db: AsyncSession) -> BreachSnapshot:
+    """
+    Return this worker's snapshot, rebuilding it when another process has
+    synced a newer version. The version is polled at most once per
+    VERSION_CHECK_INTERVAL, so most reads never touch the database.
+    """
+    global _checked_at
+    snap = _snapshot
+    if snap is not None and time.monotonic() - _checked_at < VERSION_CHECK_INTERVAL:
+        return snap
+    async with _lock:
+        snap = _snapshot
+        if snap is not None and time.monotonic() - _checked_at < VERSION_CHECK_INTERVAL:
+            return snap
+        version = await db.run_sync(crud.get_sync_version, SNAPSHOT_SOURCE)
+        if snap is None or snap.version != version:
+            return await db.run_sync(_rebuild, version)
+        _checked_at = time.monotonic()
+        return snap
@@ -0,0 +1,137 @@
+# app/services/cpe_matching.py
+
+import re
+from typing import Optional, List
+
+_VERSION_PART = re.compile(r"\d+|[a-z]+")
+# CPE 2.3 version values that mean "any version"
+_ANY_VERSION = {"*", "-", ""}
+# Pre-release markers sort below the release they precede, in this order
+_PRE_RELEASE_RANK = {
+    "dev": 0, "snapshot": 0,
+    "a": 1, "alpha": 1,
+    "b": 2, "beta": 2,
+    "m": 3, "milestone": 3,
+    "c": 4, "pre": 4, "preview": 4, "rc": 4,
+}
+# Key characters: pre-release < end of version < number < other suffix (sp1, update, ...)
+_KEY_PRE, _KEY_END, _KEY_NUM, _KEY_POST = "A", "M", "N", "P"
+
+
+def version_sort_key(version: Optional[str]) -> Optional[str]:
+    """
+    Map a version string to a key whose byte order matches version order:
+    numeric parts are zero-padded ('1.10' > '1.9'), trailing zero parts are
+    dropped ('1.0.0' == '1.0'), pre-release markers sort below the release
+    ('2.0-rc1' < '2.0', '1.0a' < '1.0') and other suffixes above it
+    ('2.0 sp1' > '2.0').
+    """
+    if version is None:
+        return None
+    parts = _VERSION_PART.findall(version.lower())
+    if not parts:
+        return None
+    key = []
+    numbers = []
+    for p in parts + [None]:
+        if p is not None and p.isdigit():
+            numbers.append(p.lstrip("0") or "0")
+            continue
+        while numbers and numbers[-1] == "0":
+            numbers.pop()
+        key.extend(_KEY_NUM + n.zfill(12) for n in numbers)
+        numbers = []
+        if p in _PRE_RELEASE_RANK:
+            key.append(_KEY_PRE + str(_PRE_RELEASE_RANK[p]))
+        elif p is not None:
+            key.append(_KEY_POST + p + ".")
+    return "".join(key) + _KEY_END
+
+
+def version_range_literal(
+    start: Optional[str] = None,
+    start_inclusive: bool = True,
+    end: Optional[str] = None,
+    end_inclusive: bool = False,
+) -> str:
+    """Postgres version_range literal over sort keys; a missing bound is unbounded."""
+    lower = version_sort_key(start)
+    upper = version_sort_key(end)
+    if lower and upper and lower > upper:
+        return "empty"
+    return "{}{},{}{}".format(
+        "[" if lower and start_inclusive else "(",
+        f'"{lower}"' if lower else "",
+        f'"{upper}"' if upper else "",
+        "]" if upper and end_inclusive else ")",
+    )
+
+
+def cpe_name_part(value: Optional[str]) -> Optional[str]:
+    """Normalize a vendor/product name the way CPE 2.3 spells it ('Apache HTTP' -> 'apache_http')."""
+    if not value:
+        return None
+    return re.sub(r"\s+", "_", value.strip().lower())
+
+
+def cpe_match_row(
+    cve_id: str,
+    criteria: str,
+    start: Optional[str] = None,
+    start_inclusive: bool = True,
+    end: Optional[str] = None,
+    end_inclusive: bool = False,
+) -> Optional[dict]:
+    """
+    The cve_cpe_matches row for one vulnerable CPE criteria, or None if it is
+    malformed. The CPE update field only narrows a pinned version
+    (cpe:...:2.0:sp1 is '2.0 sp1'); next to a versionStart/End range it is
+    not representable and the whole range matches.
+    """
+    parts = criteria.split(":")
+    if len(parts) < 6:
+        return None
+    vendor, product, version = parts[3], parts[4], parts[5]
+    update = parts[6] if len(parts) > 6 else "*"
+    if start is None and end is None and version not in _ANY_VERSION:
+        # criteria pins one version, e.g. cpe:2.3:a:vendor:product:1.2.3
+        if update not in _ANY_VERSION:
+            version = f"{version} {update}"
+        start, start_inclusive, end, end_inclusive = version, True, version, True
+    return {
+        "cve_id": cve_id,
+        "vendor": vendor,
+        "product": product,
+        "criteria": criteria,
+        "version_start": start,
+        "version_start_inclusive": start_inclusive,
+        "version_end": end,
+        "version_end_inclusive": end_inclusive,
+        "versions": version_range_literal(start, start_inclusive, end, end_inclusive),
+    }
+
+
+def parse_cpe_matches(cve_item: dict) -> List[dict]:
+    """Extract one row per vulnerable cpeMatch, keeping its version range."""
+    cve = cve_item.get("cve", {})
+    cve_id = cve.get("id", "")
+    rows = []
+    for config in cve.get("configurations", []):
+        for node in config.get("nodes", []):
+            for match in node.get("cpeMatch", []):
+                if not match.get("vulnerable", False):
+                    continue
+                if "versionStartIncluding" in match:
+                    start, start_inclusive = match["versionStartIncluding"], True
+                else:
+                    start, start_inclusive = match.get("versionStartExcluding"), False
+                if "versionEndIncluding" in match:
+                    end, end_inclusive = match["versionEndIncluding"], True
+                else:
+                    end, end_inclusive = match.get("versionEndExcluding"), False
+                row = cpe_match_row(
+                    cve_id, match.get("criteria", ""), start, start_inclusive, end, end_inclusive
+                )
+                if row is not None:
+                    rows.append(row)
+    return rows
@@ -0,0 +1,99 @@
+# app/services/domain_utils.py
+
+from typing import Optional
+from urllib.parse import urlparse
+
+# Multi-label public suffixes we actually see in HIBP and vendor data. Anything
+# not listed is treated as a single-label TLD, i.e. eTLD+1 == last two labels.
+MULTI_LABEL_SUFFIXES = frozenset({
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "me.uk", "net.uk", "ltd.uk", "plc.uk",
+    "com.au", "net.au", "org.au", "edu.au", "gov.au", "asn.au", "id.au",
+    "co.nz", "org.nz", "net.nz", "govt.nz", "ac.nz",
+    "co.jp", "ne.jp", "or.jp", "ac.jp", "go.jp",
+    "co.kr", "or.kr", "ne.kr", "go.kr",
+    "com.br", "net.br", "org.br", "gov.br",
+    "com.cn", "net.cn", "org.cn", "gov.cn", "edu.cn",
+    "com.hk", "org.hk", "net.hk", "edu.hk",
+    "com.tw", "org.tw", "net.tw", "edu.tw",
+    "com.sg", "org.sg", "net.sg", "edu.sg", "gov.sg",
+    "com.my", "org.my", "net.my",
+    "co.in", "net.in", "org.in", "gen.in", "firm.in", "ind.in",
+    "co.za", "org.za", "net.za", "gov.za",
+    "com.mx", "org.mx", "gob.mx",
+    "com.ar", "org.ar", "gob.ar",
+    "com.tr", "org.tr", "net.tr", "gen.tr",
+    "com.ru", "org.ru", "net.ru",
+    "com.ua", "org.ua", "net.ua",
+    "com.pl", "org.pl", "net.pl",
+    "co.il", "org.il", "net.il",
+    "com.vn", "net.vn", "org.vn",
+    "co.id", "or.id", "web.id",
+    "com.ph", "net.ph", "org.ph",
+    "com.pk", "net.pk", "org.pk",
+    "com.sa", "net.sa", "org.sa",
+    "com.eg", "org.eg",
+    "co.th", "in.th", "or.th",
+})
+
+
+def normalize_host(value: Optional[str]) -> Optional[str]:
+    """
+    Reduce a URL, e-mail domain or bare host to a lowercase host name without
+    scheme, credentials, port, path, trailing dot or leading 'www.'.
+    """
+    if not value:
+        return None
+    value = value.strip().lower()
+    if "://" not in value:
+        value = "//" + value
+    host = urlparse(value).hostname or ""
+    host = host.strip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    if not host or "." not in host:
+        return None
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        pass
+    return host
+
+
+def registrable_domain(value: Optional[str]) -> Optional[str]:
+    """Return the eTLD+1 for a host, e.g. 'mail.example.co.uk' -> 'example.co.uk'."""
+    host = normalize_host(value)
+    if not host:
+        return None
+    labels = host.split(".")
+    suffix_len = 2 if ".".join(labels[-2:]) in MULTI_LABEL_SUFFIXES else 1
+    if len(labels) <= suffix_len:
+        return None
+    return ".".join(labels[-(suffix_len + 1):])
+
+
+def reversed_domain_key(value: Optional[str]) -> Optional[str]:
+    """
+    Reverse the labels of a host ('mail.example.com' -> 'com.example.mail') so
+    that every subdomain of a host shares its key as a prefix and can be found
+    with a range scan over the sorted keys.
+    """
+    host = normalize_host(value)
+    if not host:
+        return None
+    return ".".join(reversed(host.split(".")))
+
+
+def ancestor_keys(value: Optional[str]) -> list:
+    """
+    Reversed keys of a host and each parent down to its registrable domain,
+    e.g. 'a.mail.example.com' -> ['com.example.mail.a', 'com.example.mail', 'com.example'].
+    """
+    key = reversed_domain_key(value)
+    base = reversed_domain_key(registrable_domain(value))
+    if not key or not base:
+        return []
+    labels = key.split(".")
+    keys = []
+    for n in range(len(labels), len(base.split(".")) - 1, -1):
+        keys.append(".".join(labels[:n]))
+    return keys
@@ -0,0 +1,259 @@
+# app/services/instrumentation.py
+"""
+Opt-in (INSTRUMENTATION_ENABLED) diagnostics for the async web workers:
+
+- LoopMonitor measures event-loop lag with a ticker coroutine, and a
+  watchdog thread logs a stack sample of the loop thread whenever a callback
+  keeps the loop busy for longer than LOOP_BLOCK_THRESHOLD_MS; the sample
+  shows the sync call (blocking DB work, time.sleep, ...) that is to blame.
+- RequestTimingMiddleware keeps a latency histogram per route template and
+  logs requests slower than SLOW_REQUEST_MS.
+
+Both are exposed at GET /diagnostics/timings.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from bisect import bisect_left
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency buckets; one more bucket holds everything slower
+TIMING_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+LOOP_TICK_SECONDS = 0.05
+# Stack samples logged per blocking episode, one every block threshold
+MAX_SAMPLES_PER_BLOCK = 3
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; callers serialize access."""
+
+    def __init__(self):
+        self.counts = [0] * (len(TIMING_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect_left(TIMING_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (max_ms for the open bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(TIMING_BUCKETS_MS, self.counts):
+            seen += n
+            if seen >= rank:
+                return round(min(bound, self.max_ms), 2)
+        return round(self.max_ms, 2)
+
+    def snapshot(self) -> dict:
+        buckets = {f"le_{bound}": n for bound, n in zip(TIMING_BUCKETS_MS, self.counts)}
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else None,
+            "max_ms": round(self.max_ms, 2),
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class RouteTimings:
+    """Per-route latency histograms, keyed by method and path template."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Histogram] = {}
+        self._slow: Dict[str, int] = {}
+
+    def observe(self, key: str, ms: float, slow: bool):
+        with self._lock:
+            histogram = self._routes.get(key)
+            if histogram is None:
+                histogram = self._routes[key] = Histogram()
+            histogram.observe(ms)
+            if slow:
+                self._slow[key] = self._slow.get(key, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                key: {**histogram.snapshot(), "slow": self._slow.get(key, 0)}
+                for key, histogram in sorted(self._routes.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self._slow.clear()
+
+
+class LoopMonitor:
+    """
+    The ticker coroutine sleeps LOOP_TICK_SECONDS at a time and records how
+    late it wakes up (the loop lag) plus a heartbeat. The watchdog thread
+    cannot be blocked by the loop, so when the heartbeat goes stale it can
+    still grab the loop thread's current frame with sys._current_frames().
+    """
+
+    def __init__(self, block_threshold_ms: float, tick_seconds: float = LOOP_TICK_SECONDS):
+        self.block_threshold = block_threshold_ms / 1000
+        self.tick_seconds = tick_seconds
+        self.lag = Histogram()
+        self.blocked = 0
+        self._lock = threading.Lock()
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        """Start monitoring the running loop; call from the loop thread."""
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop_event.clear()
+        self._task = asyncio.get_running_loop().create_task(self._tick())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stop_event.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(self.block_threshold + 1)
+            self._watchdog = None
+
+    async def _tick(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.tick_seconds
+            await asyncio.sleep(self.tick_seconds)
+            lag_ms = max(0.0, loop.time() - expected) * 1000
+            self._heartbeat = time.monotonic()
+            with self._lock:
+                self.lag.observe(lag_ms)
+            if lag_ms >= self.block_threshold * 1000:
+                logger.warning(f"Event loop was blocked for {lag_ms:.0f} ms")
+
+    def _watch(self):
+        episode = None
+        samples = 0
+        next_sample = 0.0
+        while not self._stop_event.wait(self.block_threshold / 4):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - self.tick_seconds
+            if stalled < self.block_threshold:
+                continue
+            if heartbeat != episode:
+                episode, samples, next_sample = heartbeat, 0, stalled
+                with self._lock:
+                    self.blocked += 1
+            if samples >= MAX_SAMPLES_PER_BLOCK or stalled < next_sample:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            samples += 1
+            next_sample = stalled + self.block_threshold
+            logger.warning(
+                f"Event loop blocked for {stalled * 1000:.0f} ms so far; loop thread stack:\n"
+                + "".join(traceback.format_stack(frame))
+            )
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "block_threshold_ms": self.block_threshold * 1000,
+                "blocked": self.blocked,
+                "lag": self.lag.snapshot(),
+            }
+
+
+class RequestTimingMiddleware:
+    """
+    ASGI middleware recording each HTTP request's duration under its route
+    template (e.g. "GET /breaches/{breach_id}"), so per-route histograms
+    stay bounded. Event streams are skipped: they are open by design.
+    """
+
+    def __init__(self, app, slow_request_ms: float):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                streaming = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not streaming:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                # the router stores the matched route in the (shared) scope
+                route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+                key = f"{scope['method']} {route}"
+                slow = elapsed_ms >= self.slow_request_ms
+                route_timings.observe(key, elapsed_ms, slow)
+                if slow:
+                    logger.warning(f"Slow request {key} ({scope['path']}) -> {status} in {elapsed_ms:.0f} ms")
+
+
+route_timings = RouteTimings()
+_monitor: Optional[LoopMonitor] = None
+
+
+def start_loop_monitor(block_threshold_ms: float) -> LoopMonitor:
+    global _monitor
+    if _monitor is None:
+        _monitor = LoopMonitor(block_threshold_ms)
+        _monitor.start()
+    return _monitor
+
+
+async def stop_loop_monitor():
+    global _monitor
+    if _monitor is not None:
+        await _monitor.stop()
+        _monitor = None
+
+
+def get_timings() -> dict:
+    return {
+        "loop": _monitor.snapshot() if _monitor is not None else None,
+        "routes": route_timings.snapshot(),
+    }
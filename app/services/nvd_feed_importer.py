@@ -0,0 +1,210 @@
+# app/services/nvd_feed_importer.py
+
+import argparse
+import glob
+import gzip
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy.orm import Session
+
+from core.config import NVD_FEED_DIR
+from .. import crud
+from ..database import SessionLocal, async_engine, engine, init_db
+from ..models import NVDFeedImport
+from ..security_vulnerability import (
+    CVE_SYNC_COLUMNS, NVD_SYNC_SOURCE, cve_upsert, invalidate_stats_cache, parse_cve_item, replace_cpe_matches,
+)
+from .cpe_matching import parse_cpe_matches
+
+logger = logging.getLogger(__name__)
+
+FEED_PATTERN = "nvdcve-2.0-*.json*"
+# sync_jobs source of POST /api/vulnerabilities/import-feeds (see sync_runner.SYNC_SOURCES)
+FEED_SYNC_SOURCE = "nvd-feeds"
+FEED_READ_SIZE = 1 << 20  # characters per read from the (decompressed) feed
+FEED_BATCH_SIZE = 1000
+_ARRAY_START = re.compile(r'"vulnerabilities"\s*:\s*\[')
+
+
+def iter_feed_items(path: str):
+    """
+    Yield the objects of a feed's "vulnerabilities" array one at a time, so a
+    multi-hundred-MB yearly file never has to be held in memory.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    decoder = json.JSONDecoder()
+    with opener(path, "rt", encoding="utf-8") as fh:
+        buf = ""
+        while True:
+            chunk = fh.read(FEED_READ_SIZE)
+            if not chunk:
+                return
+            buf += chunk
+            match = _ARRAY_START.search(buf)
+            if match:
+                buf = buf[match.end():]
+                break
+            buf = buf[-64:]  # the key may straddle two reads
+
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buf):
+                chunk = fh.read(FEED_READ_SIZE)
+                if not chunk:
+                    return
+                buf, pos = chunk, 0
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # the object is cut off at the end of the buffer
+                chunk = fh.read(FEED_READ_SIZE)
+                if not chunk:
+                    raise
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            yield item
+            pos = end
+
+
+def _init_worker():
+    # Connections inherited from the parent process must not be reused
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+
+
+def import_feed_file(path: str, batch_size: int = FEED_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Import one feed file. Progress is committed together with each batch, so
+    an interrupted import resumes at the first uncommitted item.
+    """
+    filename = os.path.basename(path)
+    file_size = os.path.getsize(path)
+    started = time.perf_counter()
+
+    with SessionLocal() as db:
+        progress = db.get(NVDFeedImport, filename)
+        if progress is None or progress.file_size != file_size:
+            if progress is None:
+                progress = NVDFeedImport(filename=filename)
+                db.add(progress)
+            # a new or changed file starts over, and is not complete until it is read to the end
+            progress.file_size = file_size
+            progress.items_done = 0
+            progress.started_at = datetime.utcnow()
+            progress.completed_at = None
+            db.commit()
+        elif progress.completed_at:
+            return {"file": filename, "status": "already_imported", "items": 0, "seconds": 0.0}
+
+        skip = progress.items_done
+        seen = skip
+        batch: Dict[str, dict] = {}
+        batch_matches: Dict[str, list] = {}
+
+        def flush():
+            if batch:
+                db.execute(cve_upsert(list(batch.values())))
+                replace_cpe_matches(db, batch_matches)
+                batch.clear()
+                batch_matches.clear()
+            progress.items_done = seen
+            db.commit()
+
+        for index, item in enumerate(iter_feed_items(path)):
+            if index < skip:
+                continue
+            seen = index + 1
+            try:
+                cve_data = parse_cve_item(item)
+                matches = parse_cpe_matches(item)
+            except Exception as e:
+                logger.error(f"{filename}: error parsing item {index}: {e}")
+                continue
+            if cve_data["cve_id"]:
+                batch[cve_data["cve_id"]] = {col: cve_data.get(col) for col in CVE_SYNC_COLUMNS}
+                batch_matches[cve_data["cve_id"]] = matches
+            if len(batch) >= batch_size:
+                flush()
+
+        progress.completed_at = datetime.utcnow()
+        flush()
+
+    seconds = time.perf_counter() - started
+    imported = seen - skip
+    logger.info(f"{filename}: {imported} items in {seconds:.1f}s ({imported / max(seconds, 1e-9):.0f}/s)")
+    return {
+        "file": filename,
+        "status": "resumed" if skip else "imported",
+        "items": imported,
+        "seconds": round(seconds, 2),
+    }
+
+
+def import_feeds(paths: List[str], workers: int = None, batch_size: int = FEED_BATCH_SIZE) -> Dict[str, Any]:
+    """Import feed files in parallel, one file per worker process."""
+    paths = sorted(paths)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths) or 1))
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(import_feed_file, p, batch_size): p for p in paths}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"Error importing {futures[future]}: {e}")
+                results.append({"file": os.path.basename(futures[future]), "status": "failed", "error": str(e)})
+
+    seconds = time.perf_counter() - started
+    items = sum(r.get("items", 0) for r in results)
+    if items:
+        # let every worker's stats cache see the imported rows
+        with SessionLocal() as db:
+            crud.bump_sync_version(db, NVD_SYNC_SOURCE)
+            db.commit()
+        invalidate_stats_cache()
+    return {
+        "files": sorted(results, key=lambda r: r["file"]),
+        "items": items,
+        "seconds": round(seconds, 2),
+        "items_per_second": round(items / seconds, 1) if seconds else 0.0,
+    }
+
+
+def find_feed_files(directory: str, pattern: str = FEED_PATTERN) -> List[str]:
+    return sorted(glob.glob(os.path.join(directory, pattern)))
+
+
+def import_feed_dir(db: Session, pattern: str = FEED_PATTERN, workers: Optional[int] = None) -> Dict[str, Any]:
+    """Sync job entry point: import the files of NVD_FEED_DIR matching `pattern`."""
+    if not NVD_FEED_DIR:
+        raise RuntimeError("NVD_FEED_DIR is not configured")
+    return import_feeds(find_feed_files(NVD_FEED_DIR, pattern), workers=workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import NVD 2.0 JSON feed files into the cves table")
+    parser.add_argument("paths", nargs="+", help="feed files or directories containing them")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=FEED_BATCH_SIZE)
+    args = parser.parse_args()
+
+    files = []
+    for p in args.paths:
+        files.extend(find_feed_files(p) if os.path.isdir(p) else [p])
+
+    init_db()
+    summary = import_feeds(files, workers=args.workers, batch_size=args.batch_size)
+    print(json.dumps(summary, indent=2))
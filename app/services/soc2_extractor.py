@@ -11,8 +11,8 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from pdf_parser import extract_text
 from soc2_scoring import calculate_soc2_score
+from .domain_utils import registrable_domain
 
-from urllib.parse import urlparse
 from googleapiclient.discovery import build
 from core.config import GOOGLE_API_KEY, GOOGLE_CX
 
@@ -91,14 +91,10 @@ class SOC2Extractor:
         for item in resp.get("items", []):
             link = item.get("link")
             if link:
-                # Get netloc (e.g., 'www.example.com')
-                netloc = urlparse(link).netloc
-
-                # Strip common subdomains like 'www.'
-                parts = netloc.split('.')
-                if len(parts) >= 2:
-                    # Return only domain + TLD, e.g., 'example.com'
-                    return ".".join(parts[-2:])
+                # Reduce to the registrable domain, e.g. 'www.example.co.uk' -> 'example.co.uk'
+                domain = registrable_domain(link)
+                if domain:
+                    return domain
         
         return None 
         
@@ -129,6 +125,9 @@ class SOC2Extractor:
                 # Default to using the company name as domain if Google fails
                 fallback_domain = data["company_name"].lower().replace(" ", "").replace(",", "").replace(".", "") + ".com"
                 data["company_domain"] = fallback_domain
+        elif data.get("company_domain"):
+            # LLM output may be a URL or carry 'www.'; store the same form breaches are indexed by
+            data["company_domain"] = registrable_domain(data["company_domain"]) or data["company_domain"]
         
         score = calculate_soc2_score(data)
         return {"extracted": data, "score": score}
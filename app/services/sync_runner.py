@@ -0,0 +1,186 @@
+# app/services/sync_runner.py
+
+import json
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from core.config import HIBP_SYNC_INTERVAL_MINUTES, NVD_SYNC_INTERVAL_MINUTES
+from ..database import SessionLocal, advisory_lock, advisory_lock_held
+from ..models import SyncJob
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+# Serializes the "is a periodic job due?" check across sync workers
+SCHEDULER_LOCK = "sync-scheduler"
+# A running job whose source lock is free for longer than this lost its worker
+STALE_JOB_GRACE = timedelta(minutes=1)
+
+
+def _sync_nvd(db: Session, days: Optional[int] = None, backfill: bool = False) -> dict:
+    from ..security_vulnerability import VulnerabilityService
+
+    return VulnerabilityService(db).sync_cves(days, backfill=backfill)
+
+
+def _sync_hibp(db: Session, force: bool = False) -> dict:
+    from .breach_service import fetch_all_hibp_breaches
+
+    return fetch_all_hibp_breaches(db, force=force)
+
+
+def _import_nvd_feeds(db: Session, pattern: Optional[str] = None, workers: Optional[int] = None) -> dict:
+    # the importer forks its process pool here, in the worker, never in a web process
+    from .nvd_feed_importer import FEED_PATTERN, import_feed_dir
+
+    return import_feed_dir(db, pattern or FEED_PATTERN, workers)
+
+
+# source -> (sync(db, **job.params) returning its counts, schedule interval in minutes; 0 = manual only)
+SYNC_SOURCES = {
+    "nvd": (_sync_nvd, NVD_SYNC_INTERVAL_MINUTES),
+    "hibp": (_sync_hibp, HIBP_SYNC_INTERVAL_MINUTES),
+    "nvd-feeds": (_import_nvd_feeds, 0),
+}
+
+
+def sync_lock_name(source: str) -> str:
+    """Advisory lock held while a sync of `source` runs, e.g. 'nvd-sync'."""
+    return f"{source}-sync"
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_sync_job(db: Session, source: str, params: Optional[dict] = None, trigger: str = "api") -> Optional[SyncJob]:
+    """
+    Queue a sync of `source` for the sync worker and commit. Returns None when
+    a job for that source is already queued or running (the partial unique
+    index ux_sync_jobs_active_source admits only one).
+    """
+    table = SyncJob.__table__
+    job_id = db.execute(
+        pg_insert(table)
+        .values(source=source, status="queued", trigger=trigger, params=params or {}, created_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=[table.c.source], index_where=table.c.status.in_(ACTIVE_STATUSES))
+        .returning(table.c.id)
+    ).scalar()
+    db.commit()
+    return db.get(SyncJob, job_id) if job_id else None
+
+
+def schedule_due_jobs(db: Session) -> List[str]:
+    """Queue a job for every source whose last job (any trigger) is older than its interval."""
+    queued = []
+    with advisory_lock(SCHEDULER_LOCK) as acquired:
+        if not acquired:
+            return queued
+        now = datetime.utcnow()
+        for source, (_, interval) in SYNC_SOURCES.items():
+            if interval <= 0:
+                continue
+            last = db.execute(select(func.max(SyncJob.created_at)).where(SyncJob.source == source)).scalar()
+            if last is None or now - last >= timedelta(minutes=interval):
+                if enqueue_sync_job(db, source, trigger="schedule"):
+                    queued.append(source)
+    return queued
+
+
+def claim_next_job(db: Session) -> Optional[int]:
+    """Mark the oldest queued job as running by this worker; SKIP LOCKED lets workers claim concurrently."""
+    pending = (
+        select(SyncJob.id)
+        .where(SyncJob.status == "queued")
+        .order_by(SyncJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    job_id = db.execute(
+        update(SyncJob)
+        .where(SyncJob.id == pending)
+        .values(status="running", started_at=datetime.utcnow(), worker=worker_id())
+        .returning(SyncJob.id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    db.commit()
+    return job_id
+
+
+def fail_stale_jobs(db: Session) -> int:
+    """
+    Fail running jobs whose worker died: a live worker holds the source's
+    advisory lock until the outcome is committed, and Postgres drops it
+    with the worker's connection.
+    """
+    cutoff = datetime.utcnow() - STALE_JOB_GRACE
+    running = db.execute(
+        select(SyncJob.id, SyncJob.source).where(SyncJob.status == "running", SyncJob.started_at < cutoff)
+    ).all()
+    failed = 0
+    for job_id, source in running:
+        if advisory_lock_held(sync_lock_name(source)):
+            continue
+        failed += db.execute(
+            update(SyncJob)
+            .where(SyncJob.id == job_id, SyncJob.status == "running")
+            .values(status="failed", error="Worker exited before the job finished", finished_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    db.commit()
+    return failed
+
+
+def _finish_job(db: Session, job_id: int, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+    db.execute(
+        update(SyncJob)
+        .where(SyncJob.id == job_id)
+        .values(
+            status=status,
+            # sync results may carry datetimes
+            result=json.loads(json.dumps(result, default=str)) if result is not None else None,
+            error=error,
+            finished_at=datetime.utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def run_sync_job(job_id: int) -> str:
+    """
+    Run a claimed job with its own session under the source's advisory
+    lock and record the outcome. Returns the final status.
+    """
+    with SessionLocal() as db:
+        job = db.get(SyncJob, job_id)
+        source, params = job.source, dict(job.params or {})
+        if source not in SYNC_SOURCES:
+            _finish_job(db, job_id, "failed", error=f"Unknown sync source '{source}'")
+            return "failed"
+    sync, _ = SYNC_SOURCES[source]
+
+    with advisory_lock(sync_lock_name(source)) as acquired, SessionLocal() as db:
+        if not acquired:
+            _finish_job(db, job_id, "failed", error=f"Another {source} sync is still running")
+            return "failed"
+        started = datetime.utcnow()
+        try:
+            result = sync(db, **params)
+        except Exception as e:
+            db.rollback()
+            logger.exception(f"Sync job {job_id} ({source}) failed")
+            _finish_job(db, job_id, "failed", error=str(e))
+            return "failed"
+        logger.info(f"Sync job {job_id} ({source}) finished in {(datetime.utcnow() - started).total_seconds():.1f}s: {result}")
+        # the outcome is committed before the lock is released (see fail_stale_jobs)
+        _finish_job(db, job_id, "succeeded", result=result)
+        return "succeeded"
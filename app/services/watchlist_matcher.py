@@ -0,0 +1,140 @@
+# app/services/watchlist_matcher.py
+
+import re
+from collections import deque
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .cpe_matching import cpe_name_part
+from .domain_utils import registrable_domain
+
+# Entries created without an explicit threshold alert from CVSS 7.0 (HIGH) up
+DEFAULT_MIN_CVSS_SCORE = 7.0
+# Shorter keywords match too much unrelated description text
+MIN_KEYWORD_LENGTH = 4
+
+_LEGAL_SUFFIXES = re.compile(
+    r"[\s,]+(inc|incorporated|corp|corporation|co|company|llc|llp|ltd|limited|plc|gmbh|ag|sa|bv|pty|pte)\.?$"
+)
+
+
+class AhoCorasick:
+    """
+    Multi-pattern substring search: after an O(total pattern length) build,
+    one pass over a text reports every occurrence of every pattern.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, object]]):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out: List[list] = [[]]
+        for pattern, value in patterns:
+            if pattern:
+                self._add(pattern, value)
+        self._link()
+
+    def _add(self, pattern: str, value):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), value))
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                # inherit the matches of the longest proper suffix
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __bool__(self):
+        return len(self._goto) > 1
+
+    def iter(self, text: str) -> Iterator[Tuple[int, int, object]]:
+        """Yield (start, end, value) for every pattern occurrence in text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, value in out[state]:
+                yield i - length + 1, i + 1, value
+
+
+def report_vendor(company_name: Optional[str], company_domain: Optional[str]) -> Optional[dict]:
+    """
+    Watchlist fields for the vendor a SOC 2 report describes: the CPE vendor
+    is guessed from the registrable domain's first label ('atlassian.com' ->
+    'atlassian'), and the company name and that label become keywords.
+    """
+    domain = registrable_domain(company_domain)
+    if not domain:
+        return None
+    label = domain.split(".")[0]
+    name = _LEGAL_SUFFIXES.sub("", (company_name or "").strip().lower()).strip()
+    keywords = sorted({k for k in (name, label) if len(k) >= MIN_KEYWORD_LENGTH})
+    return {
+        "name": (company_name or "").strip() or domain,
+        "vendor": cpe_name_part(label),
+        "keywords": keywords,
+        "vendor_domain": domain,
+    }
+
+
+class WatchlistMatcher:
+    """
+    All active watchlist entries compiled into one automaton. A CVE is
+    matched by scanning a single haystack made of its CPE vendor:product
+    pairs ('|apache:log4j|...') followed by its lowercased description:
+
+    - `|vendor:` and `|vendor:product|` patterns can only hit the CPE part
+    - keyword patterns only count in the description, on word boundaries
+    """
+
+    def __init__(self, entries: Iterable):
+        self.entries = {e.id: e for e in entries}
+        patterns = []
+        for entry in self.entries.values():
+            if entry.vendor:
+                if entry.product:
+                    patterns.append((f"|{entry.vendor}:{entry.product}|", (entry.id, "cpe")))
+                else:
+                    patterns.append((f"|{entry.vendor}:", (entry.id, "cpe")))
+            for keyword in entry.keywords or ():
+                keyword = keyword.strip().lower()
+                if len(keyword) >= MIN_KEYWORD_LENGTH:
+                    patterns.append((keyword, (entry.id, "keyword")))
+        self.automaton = AhoCorasick(patterns)
+
+    def __bool__(self):
+        return bool(self.automaton)
+
+    def match(self, cpe_pairs: Iterable[Tuple[str, str]], description: Optional[str]) -> dict:
+        """Return {entry_id: 'cpe' | 'keyword'}; a CPE hit wins over a keyword hit."""
+        cpe_text = "|" + "|".join(f"{vendor}:{product}" for vendor, product in cpe_pairs) + "|"
+        text = cpe_text + "\n" + (description or "").lower()
+        boundary = len(cpe_text)
+        hits = {}
+        for start, end, (entry_id, kind) in self.automaton.iter(text):
+            if kind == "cpe":
+                if end <= boundary:
+                    hits[entry_id] = "cpe"
+            elif (
+                start > boundary
+                and not text[start - 1].isalnum()
+                and (end == len(text) or not text[end].isalnum())
+            ):
+                hits.setdefault(entry_id, "keyword")
+        return hits
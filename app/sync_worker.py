@@ -0,0 +1,57 @@
+# app/sync_worker.py
+"""
+Sync worker: runs the NVD/HIBP sync and NVD feed import jobs queued by the API (sync_jobs table)
+and queues the periodic ones, outside the web workers.
+
+    python -m app.sync_worker
+
+Several workers may run side by side; each job is claimed by exactly one.
+"""
+
+import logging
+import signal
+import threading
+
+from core.config import SYNC_WORKER_POLL_SECONDS
+from .database import SessionLocal, init_db
+from .services import sync_runner
+
+logger = logging.getLogger(__name__)
+
+
+def run_worker(stop_event: threading.Event, poll_seconds: float = SYNC_WORKER_POLL_SECONDS):
+    """Run jobs back to back until stop_event is set; a running sync is always finished first."""
+    while not stop_event.is_set():
+        try:
+            with SessionLocal() as db:
+                sync_runner.fail_stale_jobs(db)
+                for source in sync_runner.schedule_due_jobs(db):
+                    logger.info(f"Queued periodic {source} sync")
+                job_id = sync_runner.claim_next_job(db)
+        except Exception as e:
+            logger.error(f"Sync worker poll failed: {e}")
+            job_id = None
+        if job_id is not None:
+            sync_runner.run_sync_job(job_id)
+        else:
+            stop_event.wait(poll_seconds)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    stop_event = threading.Event()
+
+    def request_stop(signum, frame):
+        logger.info("Sync worker stopping after the current job (signal again to abort)")
+        stop_event.set()
+        signal.signal(signum, signal.SIG_DFL)
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    init_db()
+    logger.info(f"Sync worker {sync_runner.worker_id()} started")
+    run_worker(stop_event)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/breach_search.py
+"""
+Breach search over a seeded catalogue: the legacy four-column ILIKE scan
+(mode=substring) against the GIN-backed fulltext, fuzzy and auto modes.
+
+    BENCH_DATABASE_URL=postgresql://postgres@localhost/vendor_bench \\
+        python -m benchmarks.breach_search --rows 200000
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.scratch import use_scratch_database
+
+use_scratch_database()
+
+from sqlalchemy import text  # noqa: E402
+
+from app import crud  # noqa: E402
+from app.database import SessionLocal, engine, init_db  # noqa: E402
+
+QUERIES = ["adobe", "linkedin", "password hints", "gaming forum", "lnkedin"]
+MODES = ["substring", "fulltext", "fuzzy", "auto"]
+
+# breach names/descriptions are drawn from these, so each query hits a realistic share of rows
+SEED_SQL = """
+INSERT INTO breaches (name, title, domain, breach_date, added_date, pwn_count, description,
+                      data_classes, is_verified, is_fabricated, is_sensitive, is_retired, is_spam_list)
+SELECT (array['Adobe','LinkedIn','Canva','Zynga','Dropbox','MySpace','Gaming','Forum'])[1 + g % 8] || g,
+       (array['Adobe','LinkedIn','Canva','Zynga','Dropbox','MySpace','Gaming','Forum'])[1 + g % 8] || ' ' || g,
+       (array['adobe','linkedin','canva','zynga','dropbox','myspace','gamer','forums'])[1 + g % 8] || g || '.com',
+       date '2010-01-01' + g % 5000, date '2011-01-01' + g % 5000, (g * 7919) % 100000000,
+       'In ' || (2010 + g % 14) || ' the ' ||
+       (array['gaming forum','dating site','retail store','music service','developer platform'])[1 + g % 5] ||
+       ' suffered a breach exposing ' ||
+       (array['email addresses and passwords','usernames, password hints and IP addresses',
+              'phone numbers and physical addresses','credit card data'])[1 + g % 4] ||
+       '. ' || repeat('The data was later traded on hacking forums. ', 1 + g % 6),
+       'Email addresses;Passwords', g % 3 = 0, false, false, false, false
+FROM generate_series(1, :rows) g
+"""
+
+
+def seed(rows: int):
+    with engine.begin() as conn:
+        conn.execute(text("TRUNCATE breaches RESTART IDENTITY CASCADE"))
+        conn.execute(text(SEED_SQL), {"rows": rows})
+        conn.execute(text("ANALYZE breaches"))
+
+
+def time_query(db, term: str, mode: str, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        hits = crud.search_breach_ids(db, term, 50, mode)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), len(hits)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per query; the median is reported")
+    parser.add_argument("--no-seed", action="store_true", help="reuse the rows of a previous run")
+    args = parser.parse_args()
+
+    init_db()
+    if not args.no_seed:
+        started = time.perf_counter()
+        seed(args.rows)
+        print(f"seeded {args.rows} breaches in {time.perf_counter() - started:.1f}s")
+
+    print(f"{'query':16}" + "".join(f"{mode:>18}" for mode in MODES))
+    with SessionLocal() as db:
+        for term in QUERIES:
+            cells = []
+            for mode in MODES:
+                ms, hits = time_query(db, term, mode, args.repeat)
+                cells.append(f"{ms:9.1f} ms ({hits:>2})")
+            print(f"{term:16}" + "".join(f"{c:>18}" for c in cells))
+    print("median latency per mode, (n) = results returned, limit 50")
+
+
+if __name__ == "__main__":
+    main()
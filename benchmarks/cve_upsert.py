@@ -0,0 +1,93 @@
+# benchmarks/cve_upsert.py
+"""
+Throughput (CVEs/sec) of VulnerabilityService._store_page, the path every
+NVD sync and feed page takes: a cold load of new CVEs, an unchanged re-sync
+(prefetch only), and a re-sync where a share of the CVEs was modified.
+
+    BENCH_DATABASE_URL=postgresql://postgres@localhost/vendor_bench \\
+        python -m benchmarks.cve_upsert --cves 20000
+"""
+
+import argparse
+import time
+
+from benchmarks.scratch import use_scratch_database
+
+use_scratch_database()
+
+from sqlalchemy import text  # noqa: E402
+
+from app.database import SessionLocal, engine, init_db  # noqa: E402
+from app.models import WatchlistEntry  # noqa: E402
+from app.security_vulnerability import VulnerabilityService  # noqa: E402
+
+VENDORS = ["apache", "microsoft", "jenkins", "oracle", "cisco", "atlassian"]
+
+
+def nvd_item(n: int, modified: str = "2024-01-01T00:00:00.000") -> dict:
+    """An NVD 2.0 vulnerability shaped like the API's (metrics, weaknesses, CPE ranges)."""
+    vendor = VENDORS[n % len(VENDORS)]
+    score = 9.8 if n % 10 == 0 else 5.0 + n % 4
+    return {"cve": {
+        "id": f"CVE-2024-{n:06d}",
+        "published": "2024-01-01T00:00:00.000",
+        "lastModified": modified,
+        "descriptions": [{"lang": "en", "value": f"Remote code execution in {vendor} product {n % 50} via crafted input"}],
+        "metrics": {"cvssMetricV31": [{"cvssData": {
+            "baseScore": score, "baseSeverity": "CRITICAL" if score >= 9 else "MEDIUM",
+            "attackVector": "NETWORK", "attackComplexity": "LOW", "privilegesRequired": "NONE",
+            "userInteraction": "NONE", "scope": "UNCHANGED", "confidentialityImpact": "HIGH",
+            "integrityImpact": "HIGH", "availabilityImpact": "HIGH",
+        }}]},
+        "weaknesses": [{"description": [{"value": "CWE-502"}]}],
+        "references": [{"url": f"https://example.org/advisory/{n}"}],
+        "configurations": [{"nodes": [{"cpeMatch": [
+            {"vulnerable": True, "criteria": f"cpe:2.3:a:{vendor}:product{n % 50}:*:*:*:*:*:*:*:*",
+             "versionStartIncluding": "1.0", "versionEndExcluding": f"{2 + n % 5}.0"},
+        ]}]}],
+    }}
+
+
+def run_phase(label: str, items: list, page_size: int):
+    started = time.perf_counter()
+    new = updated = 0
+    with SessionLocal() as db:
+        service = VulnerabilityService(db)
+        for start in range(0, len(items), page_size):
+            page_new, page_updated = service._store_page(items[start:start + page_size])
+            db.commit()
+            new += page_new
+            updated += page_updated
+    seconds = time.perf_counter() - started
+    print(f"{label:28} {len(items):7} CVEs  {seconds:7.2f}s  {len(items) / seconds:9.0f} CVEs/s"
+          f"  (new {new}, updated {updated})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cves", type=int, default=20_000)
+    parser.add_argument("--page-size", type=int, default=2000, help="NVD API resultsPerPage")
+    parser.add_argument("--changed", type=float, default=0.1, help="share of CVEs modified in the last phase")
+    args = parser.parse_args()
+
+    init_db()
+    with engine.begin() as conn:
+        conn.execute(text(
+            "TRUNCATE cves, cve_cpe_matches, vulnerability_alerts, vulnerability_alert_digests, vendor_watchlist "
+            "RESTART IDENTITY CASCADE"
+        ))
+    # watched vendors make the alert path part of the measurement
+    with SessionLocal() as db:
+        db.add_all(WatchlistEntry(name=v.title(), vendor=v, min_cvss_score=9.0) for v in VENDORS[:2])
+        db.commit()
+
+    items = [nvd_item(n) for n in range(args.cves)]
+    run_phase("cold load", items, args.page_size)
+    run_phase("re-sync, unchanged", items, args.page_size)
+    step = max(1, round(1 / args.changed)) if args.changed else len(items) + 1
+    items = [nvd_item(n, "2024-02-01T00:00:00.000") if n % step == 0 else item for n, item in enumerate(items)]
+    run_phase(f"re-sync, {args.changed:.0%} modified", items, args.page_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/load_test.py
+"""
+Concurrent load against a running API server: a mix of CVE list, detail,
+search, alert and unanalyzed reads, reported as req/s, p50/p95 latency and
+errors per concurrency level.
+
+Seed the scratch database once, then start the server on it and run:
+
+    export BENCH_DATABASE_URL=postgresql://postgres@localhost/vendor_bench
+    python -m benchmarks.load_test --seed
+    DATABASE_URL=$BENCH_DATABASE_URL uvicorn app.main:app --port 8000
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000
+
+For a before/after comparison, check the revision before the asyncpg port
+out next to this tree, serve it on the same database and run the same command
+against it:
+
+    git worktree add ../vendor-before <revision>
+    (cd ../vendor-before && DATABASE_URL=$BENCH_DATABASE_URL uvicorn app.main:app --port 8001)
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8001
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+PATHS = [
+    "/api/vulnerabilities?limit=50&severity=high",
+    "/api/vulnerabilities/CVE-LOAD-4242",
+    "/api/vulnerabilities/search?q=deserialization&limit=20",
+    "/api/vulnerabilities/alerts?limit=20",
+    "/api/vulnerabilities?limit=50&days=3&unanalyzed_only=true",
+]
+
+SEED_CVES_SQL = """
+INSERT INTO cves (created_at, cve_id, published_date, cvss_v3_severity, is_analyzed, description, vendor_project)
+SELECT now(), 'CVE-LOAD-' || g, now() - (g % 500) * interval '1 hour', 2 + g % 4, g % 10 <> 0,
+       (array['Remote code execution via crafted request', 'SQL injection in login form',
+              'Insecure deserialization in plugin'])[1 + g % 3] || ' ' || g,
+       (array['jenkins:plugin', 'microsoft:windows', 'apache:struts'])[1 + g % 3]
+FROM generate_series(1, :cves) g
+"""
+
+SEED_ALERTS_SQL = """
+INSERT INTO vulnerability_alerts (cve_id, alert_type, message, is_read, created_at, dedup_key)
+SELECT 'CVE-LOAD-' || g, 'critical', 'Critical vulnerability ' || g, false,
+       now() - g * interval '1 minute', 'critical:load:' || g
+FROM generate_series(1, :alerts) g
+"""
+
+
+def seed(cves: int, alerts: int):
+    from benchmarks.scratch import use_scratch_database
+
+    use_scratch_database()
+
+    from sqlalchemy import text
+
+    from app.database import engine, init_db
+
+    init_db()
+    with engine.begin() as conn:
+        conn.execute(text("TRUNCATE cves, cve_cpe_matches, vulnerability_alerts RESTART IDENTITY CASCADE"))
+        conn.execute(text(SEED_CVES_SQL), {"cves": cves})
+        conn.execute(text(SEED_ALERTS_SQL), {"alerts": alerts})
+        conn.execute(text("ANALYZE cves"))
+        conn.execute(text("ANALYZE vulnerability_alerts"))
+
+
+async def run(base_url: str, concurrency: int, total: int) -> tuple:
+    latencies = []
+    errors = 0
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        for path in PATHS:
+            response = await client.get(path)
+            response.raise_for_status()
+
+        requests = iter(range(total))
+
+        async def worker():
+            nonlocal errors
+            for i in requests:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(PATHS[i % len(PATHS)])
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - started)
+                errors += not ok
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    return total / elapsed, p50, p95, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--requests", type=int, default=1500, help="requests per concurrency level")
+    parser.add_argument("--seed", action="store_true", help="seed BENCH_DATABASE_URL instead of running the load")
+    parser.add_argument("--cves", type=int, default=100_000)
+    parser.add_argument("--alerts", type=int, default=5000)
+    args = parser.parse_args()
+
+    if args.seed:
+        started = time.perf_counter()
+        seed(args.cves, args.alerts)
+        print(f"seeded {args.cves} CVEs and {args.alerts} alerts in {time.perf_counter() - started:.1f}s")
+        return
+
+    for concurrency in args.concurrency:
+        rps, p50, p95, errors = asyncio.run(run(args.base_url, concurrency, args.requests))
+        print(f"concurrency {concurrency:3}: {rps:8.1f} req/s  p50 {p50:7.1f} ms  p95 {p95:7.1f} ms  errors {errors}")
+
+
+if __name__ == "__main__":
+    main()
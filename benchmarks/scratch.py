@@ -0,0 +1,16 @@
+# benchmarks/scratch.py
+
+import os
+import sys
+
+
+def use_scratch_database():
+    """
+    Point the app at BENCH_DATABASE_URL before anything imports core.config.
+    Benchmarks truncate and reseed tables, so they never touch DATABASE_URL.
+    """
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        sys.exit("Set BENCH_DATABASE_URL to a scratch database; benchmarks truncate and reseed its tables")
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("API_KEY", "bench")
@@ -1,11 +1,30 @@
-from dotenv import load_dotenv
-import os
+from dotenv import load_dotenv
+import os
+
+load_dotenv()  # Automatically loads .env from root
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+API_KEY = os.getenv("API_KEY")
+
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+GOOGLE_CX      = os.getenv("GOOGLE_CX")
+
+HIBP_URL = os.getenv("HIBP_URL", "https://haveibeenpwned.com/api/v3/breaches")
 
-load_dotenv()  # Automatically loads .env from root
+# Directory of NVD 2.0 JSON feed files (nvdcve-2.0-YYYY.json.gz) for offline imports
+NVD_FEED_DIR = os.getenv("NVD_FEED_DIR")
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+# Watchlist alerts for the same vendor and severity are grouped into one digest per window
+ALERT_DIGEST_WINDOW_MINUTES = int(os.getenv("ALERT_DIGEST_WINDOW_MINUTES", "60"))
 
-API_KEY = os.getenv("API_KEY")
-
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-GOOGLE_CX      = os.getenv("GOOGLE_CX")
\ No newline at end of file
+# Periodic syncs enqueued by the sync worker (python -m app.sync_worker); 0 disables
+NVD_SYNC_INTERVAL_MINUTES = int(os.getenv("NVD_SYNC_INTERVAL_MINUTES", "120"))
+HIBP_SYNC_INTERVAL_MINUTES = int(os.getenv("HIBP_SYNC_INTERVAL_MINUTES", "1440"))
+# How often an idle sync worker looks for queued jobs
+SYNC_WORKER_POLL_SECONDS = float(os.getenv("SYNC_WORKER_POLL_SECONDS", "5"))
+# Opt-in event-loop lag / blocking-call detection and per-route timings (GET /diagnostics/timings)
+INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "false").lower() in ("1", "true", "yes")
+# A callback holding the loop this long gets a logged stack sample
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
@@ -0,0 +1,27 @@
+# tests/test_alert_stream.py
+
+import pytest
+
+from app.services.alert_stream import announce_alerts, broadcaster
+
+
+@pytest.fixture
+def latest_id(monkeypatch):
+    monkeypatch.setattr(broadcaster, "latest_id", 0)
+    return lambda: broadcaster.latest_id
+
+
+def test_commit_publishes_the_announced_alerts(db, latest_id):
+    announce_alerts(db, 7)
+    announce_alerts(db, 5)
+    assert latest_id() == 0
+    db.commit()
+    assert latest_id() == 7
+
+
+def test_rolled_back_alerts_are_not_announced_by_a_later_commit(db, latest_id):
+    announce_alerts(db, 7)
+    db.rollback()
+
+    db.commit()
+    assert latest_id() == 0
@@ -0,0 +1,18 @@
+# tests/test_breach_backfill.py
+
+from app import crud
+from app.models import Breach
+
+
+def test_unnormalizable_domains_are_backfilled_once(db):
+    db.add_all([
+        Breach(name="Adobe", domain="mail.adobe.com", data_classes=""),
+        Breach(name="Bogus", domain="not a domain", data_classes=""),
+    ])
+    db.commit()
+
+    assert crud.backfill_derived_columns(db) == 2
+    keys = dict(db.query(Breach.name, Breach.domain_key))
+    assert keys == {"Adobe": "com.adobe.mail", "Bogus": ""}
+
+    assert crud.backfill_derived_columns(db) == 0
@@ -0,0 +1,33 @@
+# tests/test_breach_search.py
+
+import pytest
+
+from app.models import Breach
+from app.routers import breaches
+from app.services import breach_snapshot
+
+
+def routes(app):
+    app.include_router(breaches.router, prefix="/breaches")
+
+
+@pytest.fixture
+def api(db, client, monkeypatch):
+    monkeypatch.setattr(breach_snapshot, "_snapshot", None)
+    return client(routes)
+
+
+def add_breach(db, name: str, description: str):
+    db.add(Breach(name=name, title=name, domain=f"{name.lower()}.com", pwn_count=1, description=description))
+    db.commit()
+
+
+def test_fulltext_match_newer_than_the_snapshot_is_rendered(db, api):
+    add_breach(db, "Adobe", "Encrypted passwords and password hints")
+    assert [b["name"] for b in api.get("/breaches/search?query=password&mode=fulltext").json()] == ["Adobe"]
+
+    # written without a version bump, so this worker keeps its snapshot
+    add_breach(db, "Canva", "Usernames and passwords")
+    found = api.get("/breaches/search?query=password&mode=fulltext").json()
+    assert sorted(b["name"] for b in found) == ["Adobe", "Canva"]
+    assert api.get("/breaches/search?query=canva&mode=substring").json() == []
@@ -0,0 +1,107 @@
+# tests/test_breach_sync.py
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.models import Breach, BreachChange
+from app.services import breach_service
+
+LAST_MODIFIED = "Mon, 01 Jan 2024 00:00:00 GMT"
+
+
+class StandInHIBP:
+    """Local stand-in for the HIBP breaches endpoint, honouring If-None-Match."""
+
+    def __init__(self):
+        self.catalogue = [
+            {"Name": "Adobe", "Title": "Adobe", "Domain": "adobe.com", "BreachDate": "2013-10-04",
+             "AddedDate": "2013-12-04T00:00:00Z", "PwnCount": 152445165, "Description": "Encrypted passwords",
+             "DataClasses": ["Email addresses", "Passwords"], "IsVerified": True},
+            {"Name": "Ex", "Title": "Ex", "Domain": "ex.com", "BreachDate": "2020-01-01",
+             "AddedDate": "2020-02-01T00:00:00Z", "PwnCount": 50, "Description": "ex",
+             "DataClasses": ["Passwords"]},
+        ]
+        self.etag = '"v1"'
+        self.requests = []
+
+    def handle(self, request: BaseHTTPRequestHandler):
+        self.requests.append(dict(request.headers))
+        if request.headers.get("If-None-Match") == self.etag:
+            request.send_response(304)
+            request.end_headers()
+            return
+        body = json.dumps(self.catalogue).encode()
+        request.send_response(200)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("ETag", self.etag)
+        request.send_header("Last-Modified", LAST_MODIFIED)
+        request.end_headers()
+        request.wfile.write(body)
+
+
+@pytest.fixture
+def hibp(monkeypatch):
+    stand_in = StandInHIBP()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            stand_in.handle(self)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(breach_service, "HIBP_URL", f"http://127.0.0.1:{server.server_port}/api/v3/breaches")
+    yield stand_in
+    server.shutdown()
+    server.server_close()
+
+
+def _changes(db):
+    return [(c.breach_name, c.change_type) for c in db.query(BreachChange).order_by(BreachChange.id)]
+
+
+def test_first_sync_inserts_and_records_changes(db, hibp):
+    result = breach_service.fetch_all_hibp_breaches(db)
+
+    assert (result["inserted"], result["updated"], result["not_modified"]) == (2, 0, False)
+    assert "If-None-Match" not in hibp.requests[0]
+    assert {b.name for b in db.query(Breach)} == {"Adobe", "Ex"}
+    assert sorted(_changes(db)) == [("Adobe", "inserted"), ("Ex", "inserted")]
+
+
+def test_unchanged_catalogue_costs_one_304(db, hibp):
+    breach_service.fetch_all_hibp_breaches(db)
+    result = breach_service.fetch_all_hibp_breaches(db)
+
+    assert result["not_modified"] is True
+    assert hibp.requests[1]["If-None-Match"] == '"v1"'
+    assert hibp.requests[1]["If-Modified-Since"] == LAST_MODIFIED
+    assert len(_changes(db)) == 2
+
+
+def test_only_breaches_whose_hash_changed_are_written(db, hibp):
+    breach_service.fetch_all_hibp_breaches(db)
+    hibp.catalogue[1]["PwnCount"] = 60
+    hibp.etag = '"v2"'
+
+    result = breach_service.fetch_all_hibp_breaches(db)
+
+    assert (result["updated"], result["inserted"], result["unchanged"]) == (1, 0, 1)
+    assert _changes(db)[-1] == ("Ex", "updated")
+    assert len(_changes(db)) == 3
+    db.expire_all()
+    assert db.query(Breach).filter(Breach.name == "Ex").one().pwn_count == 60
+
+
+def test_force_ignores_the_stored_validators(db, hibp):
+    breach_service.fetch_all_hibp_breaches(db)
+    result = breach_service.fetch_all_hibp_breaches(db, force=True)
+
+    assert "If-None-Match" not in hibp.requests[1]
+    assert (result["not_modified"], result["unchanged"]) == (False, 2)
+    assert len(_changes(db)) == 2
@@ -0,0 +1,47 @@
+# tests/test_cpe_backfill.py
+
+from datetime import datetime
+
+from app import crud
+from app import security_vulnerability as sv
+from app.models import CVE, CpeMatch
+
+
+def _stored_before_match_table(db):
+    db.add_all([
+        CVE(cve_id="CVE-2021-0001", published_date=datetime(2021, 1, 1), version_affected=[
+            "cpe:2.3:a:apache:log4j:*:*:*:*:*:*:*:*",
+            "cpe:2.3:a:apache:log4j:1.2.17:*:*:*:*:*:*:*",
+        ]),
+        CVE(cve_id="CVE-2021-0002", published_date=datetime(2021, 1, 2), version_affected=[
+            "cpe:2.3:o:microsoft:windows_10:-:*:*:*:*:*:*:*",
+            "not-a-cpe",
+        ]),
+        CVE(cve_id="CVE-2021-0003", published_date=datetime(2021, 1, 3), version_affected=[]),
+    ])
+    db.commit()
+
+
+def test_backfill_makes_existing_cves_filterable_by_vendor(db, client):
+    _stored_before_match_table(db)
+    api = client(sv.register_vulnerability_routes)
+    assert api.get("/api/vulnerabilities?vendor=apache").json() == []
+
+    assert crud.backfill_cve_cpe_matches(db, batch_size=1) == 3
+    assert [c["cve_id"] for c in api.get("/api/vulnerabilities?vendor=apache").json()] == ["CVE-2021-0001"]
+    assert [c["cve_id"] for c in api.get("/api/vulnerabilities?vendor=Microsoft").json()] == ["CVE-2021-0002"]
+
+    # without NVD's stored bounds a wildcard covers every version; a pinned criteria only its own
+    affected = api.post("/api/vulnerabilities/affected", json={"items": [
+        {"vendor": "apache", "product": "log4j", "version": "2.0"},
+    ]}).json()
+    assert [c["cve_id"] for c in affected[0]["cves"]] == ["CVE-2021-0001"]
+    pinned = db.query(CpeMatch).filter(CpeMatch.criteria.like("%:1.2.17:%")).one()
+    assert (pinned.version_start, pinned.version_end, pinned.version_end_inclusive) == ("1.2.17", "1.2.17", True)
+
+
+def test_backfill_skips_cves_that_already_have_matches(db):
+    _stored_before_match_table(db)
+    assert crud.backfill_cve_cpe_matches(db) == 3
+    assert crud.backfill_cve_cpe_matches(db) == 0
+    assert db.query(CpeMatch).count() == 3
@@ -0,0 +1,58 @@
+# tests/test_cpe_matching.py
+
+from datetime import datetime
+
+import pytest
+
+from app import security_vulnerability as sv
+from app.models import CVE, CpeMatch
+from app.services.cpe_matching import cpe_match_row, version_sort_key
+
+
+@pytest.mark.parametrize("lower, higher", [
+    ("1.9", "1.10"),
+    ("2.0-rc1", "2.0"),
+    ("2.0-beta", "2.0-rc1"),
+    ("2.0.beta2", "2.0.beta10"),
+    ("1.0a", "1.0"),
+    ("2.0-rc1", "2.0.1"),
+    ("2.0", "2.0.1"),
+    ("2.0", "2.0 sp1"),
+])
+def test_version_order(lower, higher):
+    assert version_sort_key(lower) < version_sort_key(higher)
+
+
+@pytest.mark.parametrize("version, same", [
+    ("1.0.0", "1.0"),
+    ("1.0.0", "1"),
+    ("2.0.0-RC1", "2.0-rc1"),
+])
+def test_trailing_zero_parts_are_equal(version, same):
+    assert version_sort_key(version) == version_sort_key(same)
+
+
+def test_update_field_narrows_a_pinned_version():
+    sp1 = cpe_match_row("CVE-1", "cpe:2.3:a:acme:widget:2.0:sp1:*:*:*:*:*:*")
+    assert sp1["version_start"] == sp1["version_end"] == "2.0 sp1"
+    plain = cpe_match_row("CVE-1", "cpe:2.3:a:acme:widget:2.0:*:*:*:*:*:*:*")
+    assert plain["versions"] != sp1["versions"]
+
+
+def test_affected_inventory_orders_prereleases_and_trailing_zeros(db, client):
+    db.add(CVE(cve_id="CVE-2024-0001", published_date=datetime(2024, 1, 1)))
+    db.add_all([
+        CpeMatch(**cpe_match_row("CVE-2024-0001", "cpe:2.3:a:acme:widget:*:*:*:*:*:*:*:*", end="2.0")),
+        CpeMatch(**cpe_match_row(
+            "CVE-2024-0001", "cpe:2.3:a:acme:gadget:*:*:*:*:*:*:*:*", end="1.0", end_inclusive=True
+        )),
+    ])
+    db.commit()
+
+    api = client(sv.register_vulnerability_routes)
+    affected = api.post("/api/vulnerabilities/affected", json={"items": [
+        {"vendor": "acme", "product": "widget", "version": "2.0-rc1"},
+        {"vendor": "acme", "product": "widget", "version": "2.0"},
+        {"vendor": "acme", "product": "gadget", "version": "1.0.0"},
+    ]}).json()
+    assert [len(item["cves"]) for item in affected] == [1, 0, 1]
@@ -0,0 +1,83 @@
+# tests/test_cve_pagination.py
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+
+from app import security_vulnerability as sv
+from app.models import CVE
+
+ROWS = 30000
+PAGE = 700
+
+FILTERS = [
+    # (query string, SQL predicate, select() filter, index that must serve it)
+    ("", "true", None, "ix_cves_published_id"),
+    ("&severity=high", "cvss_v3_severity = 4", CVE.cvss_v3_severity == "HIGH", "ix_cves_severity_published_id"),
+    ("&unanalyzed_only=true", "is_analyzed = false", CVE.is_analyzed == False, "ix_cves_unanalyzed_published_id"),
+]
+
+
+@pytest.fixture
+def seeded(db):
+    """ROWS CVEs over 500 hourly timestamps (so ids tie-break), 1 in 97 undated."""
+    db.execute(text("""
+        INSERT INTO cves (cve_id, created_at, published_date, cvss_v3_severity, is_analyzed)
+        SELECT 'CVE-T-' || g, now(),
+               CASE WHEN g % 97 = 0 THEN NULL ELSE now() - (g % 500) * interval '1 hour' END,
+               2 + g % 4, g % 10 <> 0
+        FROM generate_series(1, :rows) g
+    """), {"rows": ROWS})
+    db.commit()
+    db.execute(text("ANALYZE cves"))
+    return db
+
+
+def _explain(db, stmt) -> str:
+    sql = stmt.limit(50).compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    return "\n".join(row[0] for row in db.connection().exec_driver_sql(f"EXPLAIN {sql}"))
+
+
+@pytest.mark.parametrize("params, predicate, _, __", FILTERS)
+def test_cursor_walk_returns_every_row_once_in_order(seeded, client, params, predicate, _, __):
+    api = client(sv.register_vulnerability_routes)
+    seen, cursor = [], None
+    while True:
+        r = api.get(f"/api/vulnerabilities?limit={PAGE}{params}" + (f"&cursor={cursor}" if cursor else ""))
+        assert r.status_code == 200
+        seen += [cve["id"] for cve in r.json()]
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    expected = [row[0] for row in seeded.execute(text(
+        f"SELECT id FROM cves WHERE {predicate} ORDER BY published_date DESC NULLS LAST, id DESC"
+    ))]
+    assert seen == expected
+
+
+def test_invalid_cursor_is_rejected(db, client):
+    api = client(sv.register_vulnerability_routes)
+    assert api.get("/api/vulnerabilities?cursor=zzz").status_code == 400
+
+
+@pytest.mark.parametrize("_, __, condition, index", FILTERS)
+def test_deep_pages_seek_into_the_index(seeded, _, __, condition, index):
+    query = select(CVE) if condition is None else select(CVE).where(condition)
+    deep = (datetime.utcnow() - timedelta(hours=450), ROWS // 2)
+
+    first, _tail = sv.keyset_page_queries(query)
+    plan = _explain(seeded, first)
+    assert index in plan and "Sort" not in plan, plan
+
+    dated, tail = sv.keyset_page_queries(query, deep)
+    plan = _explain(seeded, dated)
+    # the cursor bound is an index condition, not a filter over the rows before it
+    assert index in plan and "Sort" not in plan, plan
+    assert "Index Cond: " in plan and "ROW(published_date, id) < ROW(" in plan, plan
+    assert "Filter: " not in plan or "ROW(" not in plan.split("Filter: ", 1)[1], plan
+
+    for stmt in (tail, *sv.keyset_page_queries(query, (None, ROWS // 2))):
+        plan = _explain(seeded, stmt)
+        assert index in plan and "Seq Scan" not in plan, plan
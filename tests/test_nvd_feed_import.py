@@ -0,0 +1,55 @@
+# tests/test_nvd_feed_import.py
+
+import gzip
+import json
+
+import pytest
+
+from app.models import CVE, NVDFeedImport
+from app.services import nvd_feed_importer
+
+
+def nvd_item(n: int) -> dict:
+    return {"cve": {
+        "id": f"CVE-2020-{n:05d}",
+        "published": "2020-01-01T00:00:00.000",
+        "lastModified": "2020-01-02T00:00:00.000",
+        "descriptions": [{"lang": "en", "value": f"Issue {n}"}],
+        "configurations": [{"nodes": [{"cpeMatch": [
+            {"vulnerable": True, "criteria": "cpe:2.3:a:acme:widget:*:*:*:*:*:*:*:*", "versionEndExcluding": "2.0"},
+        ]}]}],
+    }}
+
+
+def write_feed(path, count: int):
+    with gzip.open(path, "wt") as fh:
+        json.dump({"format": "NVD_CVE", "vulnerabilities": [nvd_item(n) for n in range(count)]}, fh)
+
+
+def test_changed_file_is_not_complete_until_reimported(db, tmp_path, monkeypatch):
+    feed = str(tmp_path / "nvdcve-2.0-2020.json.gz")
+    write_feed(feed, 5)
+    assert nvd_feed_importer.import_feed_file(feed)["status"] == "imported"
+
+    # NVD republishes the year with more items; the re-import dies after one batch
+    write_feed(feed, 9)
+    items = nvd_feed_importer.iter_feed_items
+
+    def interrupted(path):
+        for n, item in enumerate(items(path)):
+            if n == 4:
+                raise OSError("disk went away")
+            yield item
+
+    monkeypatch.setattr(nvd_feed_importer, "iter_feed_items", interrupted)
+    with pytest.raises(OSError):
+        nvd_feed_importer.import_feed_file(feed, batch_size=2)
+    db.expire_all()
+    progress = db.get(NVDFeedImport, "nvdcve-2.0-2020.json.gz")
+    assert (progress.items_done, progress.completed_at) == (4, None)
+
+    monkeypatch.setattr(nvd_feed_importer, "iter_feed_items", items)
+    result = nvd_feed_importer.import_feed_file(feed, batch_size=2)
+    assert (result["status"], result["items"]) == ("resumed", 5)
+    assert db.query(CVE).count() == 9
+    assert nvd_feed_importer.import_feed_file(feed)["status"] == "already_imported"
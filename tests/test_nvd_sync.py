@@ -0,0 +1,68 @@
+# tests/test_nvd_sync.py
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import crud
+from app.security_vulnerability import NVD_SYNC_SOURCE, NVD_WATERMARK_OVERLAP, VulnerabilityService
+
+
+@pytest.fixture
+def service(db, monkeypatch):
+    service = VulnerabilityService(db)
+    service.windows = []
+
+    def iter_cve_pages(start, end, date_field="published"):
+        service.windows.append((start, end, date_field))
+        return iter(())
+
+    monkeypatch.setattr(service.nvd_client, "iter_cve_pages", iter_cve_pages)
+    return service
+
+
+def stored_watermark(db) -> datetime:
+    db.expire_all()
+    return crud.get_sync_state(db, NVD_SYNC_SOURCE).watermark
+
+
+def set_watermark(db, watermark: datetime):
+    crud.save_sync_state(db, NVD_SYNC_SOURCE, watermark=watermark)
+    db.commit()
+
+
+def test_short_window_after_stale_watermark_keeps_it(db, service):
+    stale = datetime.utcnow() - timedelta(days=3)
+    set_watermark(db, stale)
+
+    service.sync_cves(days=1)
+    assert service.windows[0][2] == "modified"
+    assert stored_watermark(db) == stale
+
+    # the next incremental run still starts from the stale watermark
+    service.sync_cves()
+    assert service.windows[1][0] == stale - NVD_WATERMARK_OVERLAP
+    assert stored_watermark(db) > stale
+
+
+def test_backfill_keeps_existing_watermark(db, service):
+    watermark = datetime.utcnow() - timedelta(hours=2)
+    set_watermark(db, watermark)
+
+    service.sync_cves(days=30, backfill=True)
+    assert service.windows[0][2] == "published"
+    assert stored_watermark(db) == watermark
+
+
+def test_window_reaching_the_watermark_advances_it(db, service):
+    watermark = datetime.utcnow() - timedelta(hours=2)
+    set_watermark(db, watermark)
+
+    result = service.sync_cves(days=1)
+    assert stored_watermark(db) > watermark
+    assert result["watermark"] == stored_watermark(db).isoformat()
+
+
+def test_first_sync_sets_the_watermark(db, service):
+    service.sync_cves(backfill=True)
+    assert stored_watermark(db) is not None
@@ -0,0 +1,26 @@
+# tests/test_rate_limit.py
+
+from sqlalchemy import text
+
+from app.security_vulnerability import SharedTokenBucket
+
+
+def test_take_creates_the_bucket_row_when_missing(db):
+    bucket = SharedTokenBucket("test", capacity=2, refill_per_second=0.001)
+    assert bucket._take() == 2
+    assert bucket._take() < 2
+
+    # e.g. another worker's bucket row was wiped; the next take recreates it full
+    db.execute(text("DELETE FROM rate_limit_buckets"))
+    db.commit()
+    assert bucket.acquire() == 0.0
+
+
+def test_short_bucket_waits_for_the_reserved_token(db):
+    bucket = SharedTokenBucket("test", capacity=1, refill_per_second=20)
+    assert bucket.acquire() == 0.0
+    waited = bucket.acquire()
+    assert 0 < waited <= 0.05
+    # the reservation was taken up front: a third caller queues behind it
+    assert bucket._take() < 1
+
@@ -0,0 +1,59 @@
+# tests/test_watchlist.py
+
+import pytest
+
+from app.routers import watchlist
+
+
+def routes(app):
+    app.include_router(watchlist.router, prefix="/watchlist")
+
+
+@pytest.mark.parametrize("field", ["name", "min_cvss_score", "is_active"])
+def test_update_rejects_null_for_required_fields(db, client, field):
+    api = client(routes)
+    entry = api.post("/watchlist/", json={"name": "Apache", "vendor": "apache"}).json()
+
+    response = api.patch(f"/watchlist/{entry['id']}", json={field: None})
+    assert response.status_code == 422
+    assert api.get("/watchlist/").json()[0] == entry
+
+
+def test_update_clears_nullable_fields_and_keeps_unset_ones(db, client):
+    api = client(routes)
+    entry = api.post("/watchlist/", json={"name": "Apache", "vendor": "apache", "keywords": ["struts"]}).json()
+
+    updated = api.patch(f"/watchlist/{entry['id']}", json={"vendor": None, "min_cvss_score": 9.0}).json()
+    assert updated["vendor"] is None
+    assert updated["min_cvss_score"] == 9.0
+    assert updated["name"] == "Apache"
+    assert updated["keywords"] == ["struts"]
+
+
+def test_update_cannot_leave_an_entry_without_a_match_target(db, client):
+    api = client(routes)
+    entry = api.post("/watchlist/", json={"name": "Apache", "vendor": "apache"}).json()
+
+    assert api.patch(f"/watchlist/{entry['id']}", json={"vendor": "", "keywords": []}).status_code == 400
+    assert api.patch(f"/watchlist/{entry['id']}", json={"vendor": None}).status_code == 400
+    assert api.get("/watchlist/").json()[0] == entry
+
+
+@pytest.mark.parametrize("body", [
+    {"name": "Struts", "product": "struts", "keywords": ["struts"]},
+    {"name": "Apache", "vendor": "apache", "keywords": ["ssl"]},
+])
+def test_create_rejects_config_the_matcher_ignores(db, client, body):
+    api = client(routes)
+    assert api.post("/watchlist/", json=body).status_code == 422
+    assert api.get("/watchlist/").json() == []
+
+
+def test_update_rejects_product_without_vendor_and_short_keywords(db, client):
+    api = client(routes)
+    entry = api.post("/watchlist/", json={"name": "Apache", "vendor": "apache", "product": "struts",
+                                          "keywords": ["struts"]}).json()
+
+    assert api.patch(f"/watchlist/{entry['id']}", json={"vendor": None}).status_code == 422
+    assert api.patch(f"/watchlist/{entry['id']}", json={"keywords": ["ssl"]}).status_code == 422
+    assert api.get("/watchlist/").json()[0] == entry
@@ -4,4 +4,7 @@ export PERPLEXITY_API_KEY="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
 # Optionally set NVD_API_KEY if you have one:
 # export NVD_API_KEY="your_nvd_api_key"
 
+# NVD/HIBP syncs (API-triggered and periodic) run in the sync worker, not in uvicorn
+python -m app.sync_worker &
+
 uvicorn app.main:app --host 0.0.0.0 --port 8000